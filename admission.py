@@ -0,0 +1,72 @@
+import time
+
+import metrics
+
+# --- Inbound admission ---
+# Every inbound frame used to be handled inline, so a client spamming
+# cashout cost a storage round trip per frame before the game state turned
+# it away.  Each connection now gets a Gate, checked before anything else
+# touches storage:
+#   - a token bucket caps its frame rate (RATE per second, BURST at once);
+#     control frames (hello/register/watch/resume) draw on a bucket of
+#     their own, so a client reconnecting mid-burst still gets through;
+#   - a bet or cashout repeating one already admitted in the same tick,
+#     with the same payload, is a duplicate (double clicks, retry loops)
+#     and is dropped; a bet with a corrected stake is not;
+#   - an action the caller has closed (e.g. cashout after this round's
+#     cashout already went through) is dropped until reopened.
+# Rejected frames are dropped silently and counted.
+
+RATE = 10    # frames per second, sustained
+BURST = 20   # frames accepted back to back
+CONTROL = {"hello", "register", "watch", "resume"}
+CONTROL_RATE = 2
+CONTROL_BURST = 10
+
+REJECTED = metrics.Counter("aviator_frames_rejected", "Inbound frames dropped by rate limit or dedupe")
+
+
+class TokenBucket:
+    def __init__(self, rate=RATE, burst=BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = time.monotonic()
+
+    def take(self, now=None):
+        now = time.monotonic() if now is None else now
+        if now > self.stamp:
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp)*self.rate)
+            self.stamp = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class Gate:
+    def __init__(self, rate=RATE, burst=BURST):
+        self.bucket = TokenBucket(rate, burst)
+        self.control = TokenBucket(CONTROL_RATE, CONTROL_BURST)
+        self.last = {}       # action -> (tick, payload) it was last admitted with
+        self.closed = set()  # actions that can't succeed right now
+
+    def admit(self, action, tick=None, payload=None, now=None):
+        # tick is any value that changes every game tick; None skips dedupe.
+        # payload (e.g. the stake) tells a correction from a repeat.
+        if action in self.closed or (tick is not None and self.last.get(action) == (tick, payload)):
+            REJECTED.inc()
+            return False
+        bucket = self.control if action in CONTROL else self.bucket
+        if not bucket.take(now):
+            REJECTED.inc()
+            return False
+        if tick is not None:
+            self.last[action] = (tick, payload)
+        return True
+
+    def close(self, action):
+        self.closed.add(action)
+
+    def open(self, action):
+        self.closed.discard(action)
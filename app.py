@@ -1,96 +1,181 @@
-import eventlet
-eventlet.monkey_patch()
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, RedirectResponse, Response
+from starlette.middleware.sessions import SessionMiddleware
+from jinja2 import Environment
+import socketio
+import sqlite3, hashlib, time
+from ledger import Ledger, FLUSH_INTERVAL
+from wallet import Wallet
+from curve import Schedule
+from ticker import Ticker
+from resume import Sessions, ReplayBuffer
+from admission import Gate
+from history import RoundHistory
+from fairness import HashChain, uniform
+import crash_models
+import metrics
+import migrations
+from assets import Asset, Bundle
+
+# --- App Setup ---
+# FastAPI serves the pages, python-socketio the game socket.  Both sit behind
+# SessionMiddleware so socket handlers see the login session too.
+#     uvicorn app:asgi --port 5000
+SECRET_KEY = 'aviator_secret'
+app = FastAPI()
+sio = socketio.AsyncServer(async_mode="asgi", cors_allowed_origins="*")
+asgi = SessionMiddleware(socketio.ASGIApp(sio, app), secret_key=SECRET_KEY)
+jinja = Environment(autoescape=True)
 
-from flask import Flask, render_template_string, request, redirect, url_for, session
-from flask_socketio import SocketIO, emit
-import random, sqlite3, hashlib, time
+# --- Database Setup ---
+# sqlite3 blocks, so every query and ledger flush runs on one dedicated
+# thread; the event loop only awaits the result
+db = ThreadPoolExecutor(1, thread_name_prefix="db")
 
-# --- Flask Setup ---
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'aviator_secret'
-socketio = SocketIO(app, cors_allowed_origins="*")
+async def run_db(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(db, fn, *args)
 
-# --- Database Setup ---
 conn = sqlite3.connect("aviator.db", check_same_thread=False)
+migrations.migrate(conn)  # schema upgrades, see migrations.py
 c = conn.cursor()
-c.execute("""CREATE TABLE IF NOT EXISTS users(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE,
-            password TEXT,
-            balance REAL)""")
-c.execute("""CREATE TABLE IF NOT EXISTS rounds(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            crash_point REAL,
-            timestamp REAL)""")
-c.execute("""CREATE TABLE IF NOT EXISTS cashouts(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            round_id INTEGER,
-            multiplier REAL,
-            amount REAL)""")
-conn.commit()
+ledger = Ledger("aviator.db")
+START_BALANCE = 100000  # cents; money is integer cents throughout
 
 # --- Game Variables ---
-multiplier = 1.0
+schedule = None
 crash_point = 0
 round_active = False
-round_id = 0
-round_history = []
-
-players = {}  # sid -> {user_id, cashout}
-TICK = 0.05
-HOUSE_EDGE = 0.85
+# Carries on from the rounds table; each round's row is written when it
+# starts, so the bets placed in it can reference it
+round_id = c.execute("SELECT IFNULL(MAX(id),0) FROM rounds").fetchone()[0]
+round_history = RoundHistory(50)
+
+players = {}  # sid -> {user_id, cashout, token, sid}
+
+# A dropped socket's state stays resumable for a while: reconnecting with
+# auth {resume: token, seq} reattaches it and replays only the events it
+# missed, with no init or history (see resume.py)
+sessions = Sessions()
+replay = ReplayBuffer()
+
+def record(event, data, tick=False):
+    data["seq"] = replay.stamp()
+    replay.add(data["seq"], (event, data), tick)
+    return data
+
+# Ticks stay JSON here.  Socket.IO sends a bytes payload as a placeholder
+# text packet plus a separate binary attachment, i.e. two frames of ~50
+# bytes against one 66-byte multiplier_update, so tickproto's frames would
+# save nothing and double the frames per tick (aviator_web and main.py use
+# them over plain websockets)
+BROADCAST_INTERVAL = 0.05
+
+# --- Metrics ---
+TICK_DRIFT = metrics.Histogram("aviator_tick_drift_seconds", "Lateness of each broadcast tick against its intended time")
+TICKS_SKIPPED = metrics.Counter("aviator_ticks_skipped", "Late broadcast ticks merged into the next one")
+BROADCAST_SECONDS = metrics.Histogram("aviator_broadcast_seconds", "Time to emit one tick to all sockets")
+DB_FLUSH_SECONDS = metrics.Histogram("aviator_db_flush_seconds", "Ledger flush (one SQLite transaction) duration")
+DB_QUERY_SECONDS = metrics.Histogram("aviator_db_query_seconds", "Balance lookup duration on a wallet miss")
+ROUNDS = metrics.Counter("aviator_rounds", "Rounds played")
+CASHOUTS = metrics.Counter("aviator_cashouts", "Accepted cashouts")
+metrics.Gauge("aviator_ledger_rejected", "Ledger rows refused by the database and set aside", lambda: ledger.rejected)
+metrics.Gauge("aviator_connections", "Connected players", lambda: len(players))
 
 # --- Helpers ---
 def hash_password(p):
     return hashlib.sha256(p.encode()).hexdigest()
 
-def generate_crash():
-    return 1 + (random.random()*30)**1.5 * HOUSE_EDGE
+# Rounds are seeded from a provably-fair hash chain (see fairness.py); each
+# round's hash is revealed at the crash and chains back to chain.commitment
+chain = HashChain("aviator.chain")
+
+def generate_crash(round_hash):
+    return crash_models.app_crash(uniform(round_hash))
 
 def get_user_balance(user_id):
+    t0 = time.perf_counter()
     c.execute("SELECT balance FROM users WHERE id=?",(user_id,))
     res = c.fetchone()
-    return res[0] if res else 0
+    DB_QUERY_SECONDS.observe(time.perf_counter() - t0)
+    return (res[0] if res else 0) + ledger.pending_balance(user_id)
 
-def update_user_balance(user_id, amount):
-    balance = get_user_balance(user_id) + amount
-    c.execute("UPDATE users SET balance=? WHERE id=?",(balance,user_id))
-    conn.commit()
-    return balance
+def find_user(username):
+    c.execute("SELECT id,password,balance FROM users WHERE username=?",(username,))
+    return c.fetchone()
+
+def create_user(username, password):
+    # Rolled back on a duplicate username so no write lock is left open
+    # against the ledger's connection
+    with conn:
+        c.execute("INSERT INTO users(username,password,balance) VALUES(?,?,?)",
+                  (username,hash_password(password),START_BALANCE))
+
+wallet = Wallet(ledger, get_user_balance)
 
 # --- Game Loop ---
-def game_loop():
-    global multiplier, crash_point, round_active, round_id, round_history
+# The crash time is known when the round starts (see curve.py), so the loop
+# only wakes to broadcast every BROADCAST_INTERVAL and once at the crash.
+async def game_loop():
+    global schedule, crash_point, round_active, round_id, round_history
+    while True:
+        chain_index, round_hash = chain.next()
+        crash_point = generate_crash(round_hash)
+        schedule = Schedule(time.monotonic(), crash_point)
+        round_active = True
+        round_id += 1
+        ledger.add_round(round_id, crash_point, time.time())
+        for p in sessions.states.values():
+            p["cashout"] = None
+        replay.start_round()
+        # The crash point goes out only with round_crash, next to the hash
+        # that proves it
+        await sio.emit("new_round", record("new_round", {"round_id": round_id}))
+        print(f"New round #{round_id}")
+
+        # Ticks land on schedule.start + k*BROADCAST_INTERVAL however long
+        # the emits take (see ticker.py)
+        ticker = Ticker(BROADCAST_INTERVAL, schedule.start)
+        while True:
+            await asyncio.sleep(min(ticker.wait(), max(schedule.crash_at - time.monotonic(), 0)))
+            now = time.monotonic()
+            if schedule.crashed(now):
+                break
+            ticker.fire(now)
+            TICK_DRIFT.observe(ticker.lag)
+            TICKS_SKIPPED.inc(ticker.merged)
+            m = schedule.multiplier(now)
+            t0 = time.perf_counter()
+            await sio.emit("multiplier_update", record("multiplier_update", {"multiplier": round(m,2), "round_id": round_id}, tick=True))
+            BROADCAST_SECONDS.observe(time.perf_counter() - t0)
+
+        round_active = False
+        round_history.push(crash_point)
+        await sio.emit("round_crash", record("round_crash", {"crash_point": round(crash_point,2), "round_id": round_id,
+                                                            "hash": round_hash.hex(), "chain_index": chain_index,
+                                                            "stats": round_history.stats()}))
+        ROUNDS.inc()
+        await asyncio.sleep(5)
+
+async def ledger_loop():
     while True:
-        if not round_active:
-            multiplier = 1.0
-            crash_point = generate_crash()
-            round_active = True
-            round_id += 1
-            for p in players.values():
-                p["cashout"] = None
-            socketio.emit("new_round", {"round_id": round_id, "crash_point": crash_point})
-            print(f"New round #{round_id} | Crash at x{crash_point:.2f}")
-
-        multiplier += 0.01*(1 + multiplier/10)
-        socketio.emit("multiplier_update", {"multiplier": round(multiplier,2), "round_id": round_id})
-        
-        if multiplier >= crash_point:
-            round_active = False
-            round_history.append(round(crash_point,2))
-            if len(round_history) > 50:
-                round_history.pop(0)
-            socketio.emit("round_crash", {"crash_point": round(crash_point,2), "round_id": round_id})
-            c.execute("INSERT INTO rounds(crash_point,timestamp) VALUES (?,?)",(crash_point,time.time()))
-            conn.commit()
-            eventlet.sleep(5)
-        eventlet.sleep(TICK)
+        await asyncio.sleep(FLUSH_INTERVAL)
+        if ledger.has_pending():
+            # Swapped out on the loop thread, written on the db thread
+            batch = ledger.take()
+            t0 = time.perf_counter()
+            try:
+                await run_db(ledger.write, batch)
+            except sqlite3.Error as e:
+                ledger.restore(batch)
+                print(f"Ledger flush failed: {e}")
+            DB_FLUSH_SECONDS.observe(time.perf_counter() - t0)
+        wallet.evict_idle()
+        sessions.expire()
 
 # --- Routes ---
-@app.route("/")
-def index():
-    return render_template_string("""
+INDEX_HTML = """
 <!DOCTYPE html>
 <html lang="en">
 <head>
@@ -122,25 +207,13 @@ Developed by Lameck Mukabana.
 </div>
 </body>
 </html>
-""")
+"""
 
-@app.route("/register", methods=["GET","POST"])
-def register():
-    msg=""
-    if request.method=="POST":
-        username = request.form["username"]
-        password = request.form["password"]
-        if not username or not password:
-            msg="Enter both fields"
-        else:
-            try:
-                c.execute("INSERT INTO users(username,password,balance) VALUES(?,?,?)",
-                          (username,hash_password(password),1000))
-                conn.commit()
-                return redirect(url_for("login"))
-            except:
-                msg="Username exists"
-    return render_template_string("""
+@app.get("/")
+async def index(request: Request):
+    return PAGES["index"].response(request.headers)
+
+REGISTER = jinja.from_string("""
 <div style="background:#000;color:#0ff;padding:20px;border-radius:15px;width:400px;margin:auto;text-align:center;margin-top:50px;">
 <h2>Register</h2>
 <form method="post">
@@ -151,23 +224,28 @@ def register():
 <p style="color:#f00;">{{msg}}</p>
 <a href="{{url_for('login')}}">Already have account? Login</a>
 </div>
-""", msg=msg)
+""")
 
-@app.route("/login", methods=["GET","POST"])
-def login():
+@app.api_route("/register", methods=["GET","POST"])
+async def register(request: Request):
     msg=""
     if request.method=="POST":
-        username=request.form["username"]
-        password=request.form["password"]
-        c.execute("SELECT id,password FROM users WHERE username=?",(username,))
-        res=c.fetchone()
-        if res and res[1]==hash_password(password):
-            session["user_id"]=res[0]
-            session["username"]=username
-            return redirect(url_for("game"))
+        form = await request.form()
+        username = form.get("username", "")
+        password = form.get("password", "")
+        if not username or not password:
+            msg="Enter both fields"
         else:
-            msg="Invalid credentials"
-    return render_template_string("""
+            try:
+                await run_db(create_user, username, password)
+                return RedirectResponse(app.url_path_for("login"), status_code=302)
+            except sqlite3.Error:
+                msg="Username exists"
+    if not msg:
+        return PAGES["register"].response(request.headers)
+    return HTMLResponse(REGISTER.render(msg=msg))
+
+LOGIN = jinja.from_string("""
 <div style="background:#000;color:#0ff;padding:20px;border-radius:15px;width:400px;margin:auto;text-align:center;margin-top:50px;">
 <h2>Login</h2>
 <form method="post">
@@ -178,60 +256,102 @@ def login():
 <p style="color:#f00;">{{msg}}</p>
 <a href="{{url_for('register')}}">No account? Register</a>
 </div>
-""", msg=msg)
+""")
+
+@app.api_route("/login", methods=["GET","POST"])
+async def login(request: Request):
+    msg=""
+    if request.method=="POST":
+        form = await request.form()
+        username=form.get("username", "")
+        password=form.get("password", "")
+        res=await run_db(find_user, username)
+        if res and res[1]==hash_password(password):
+            wallet.warm(res[0], res[2]+ledger.pending_balance(res[0]))
+            request.session["user_id"]=res[0]
+            request.session["username"]=username
+            return RedirectResponse(app.url_path_for("game"), status_code=302)
+        else:
+            msg="Invalid credentials"
+    if not msg:
+        return PAGES["login"].response(request.headers)
+    return HTMLResponse(LOGIN.render(msg=msg))
 
-@app.route("/logout")
-def logout():
-    session.clear()
-    return redirect(url_for("index"))
+@app.get("/metrics")
+async def metrics_endpoint():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/logout")
+async def logout(request: Request):
+    request.session.clear()
+    return RedirectResponse(app.url_path_for("index"), status_code=302)
 
 # --- SocketIO Events ---
-@socketio.on("connect")
-def connect():
-    if "user_id" in session:
-        players[request.sid] = {"user_id": session["user_id"], "cashout": None}
-        emit("init", {"balance": get_user_balance(session["user_id"]),
-                      "history": round_history})
-
-@socketio.on("disconnect")
-def disconnect():
-    if request.sid in players:
-        del players[request.sid]
-
-@socketio.on("cashout")
-def cashout(data):
-    sid=request.sid
+@sio.event
+async def connect(sid, environ, auth=None):
+    session = environ["asgi.scope"].get("session", {})
+    if "user_id" not in session:
+        return
+    user_id = session["user_id"]
+    token = (auth or {}).get("resume")
+    state = sessions.get(token) if token else None
+    if state is not None and state["user_id"] == user_id:
+        sessions.resume(token)
+        if state["sid"] in players:
+            # The old socket hasn't noticed it's gone yet; this one takes over
+            del players[state["sid"]]
+            wallet.detach(user_id)
+            await sio.disconnect(state["sid"])
+        missed = replay.since((auth or {}).get("seq", -1))
+    else:
+        state = {"user_id": user_id, "cashout": None}
+        token = sessions.open(state)
+        missed = None
+    state["token"] = token
+    state["sid"] = sid
+    state["gate"] = Gate()  # per socket, see admission.py
+    if user_id not in wallet.balances:
+        wallet.warm(user_id, await run_db(get_user_balance, user_id))
+    players[sid] = state
+    balance = wallet.attach(user_id)
+    await sio.emit("session", {"token": token, "resumed": missed is not None, "balance": balance/100}, to=sid)
+    if missed is None:
+        await sio.emit("init", {"balance": balance/100,
+                                "commitment": chain.commitment,
+                                "history": round_history.snapshot()}, to=sid)
+        return
+    for event, data in missed:
+        await sio.emit(event, data, to=sid)
+
+@sio.event
+async def disconnect(sid, reason=None):
+    if sid in players:
+        state = players.pop(sid)
+        wallet.detach(state["user_id"])
+        sessions.detach(state["token"])
+
+@sio.event
+async def cashout(sid, data):
     if sid not in players: return
+    if not players[sid]["gate"].admit("cashout", replay.seq, data.get("bet")): return
     if not round_active: return
     if players[sid]["cashout"] is not None: return
-    bet=float(data.get("bet",0))
-    mult=float(data.get("multiplier",1))
+    now=time.monotonic()
+    if schedule.crashed(now): return
+    stake=round(float(data.get("bet",0))*100)
+    mult=schedule.multiplier(now)
     user_id = players[sid]["user_id"]
-    balance=get_user_balance(user_id)
-    if bet>balance: return
-    win=bet*mult
-    balance=update_user_balance(user_id,-bet+win)
+    if wallet.reserve(user_id,stake) is None: return
+    win=int(stake*mult)
+    balance=wallet.settle(user_id,win)
     players[sid]["cashout"]=mult
-    c.execute("INSERT INTO cashouts(user_id,round_id,multiplier,amount) VALUES (?,?,?,?)",
-              (user_id,round_id,mult,win))
-    conn.commit()
-    emit("cashout_result",{"balance":balance,"win":win})
+    ledger.add_bet(user_id,round_id,stake,mult,win)
+    CASHOUTS.inc()
+    await sio.emit("cashout_result",{"balance":balance/100,"win":win/100,"multiplier":round(mult,2)},to=sid)
 
 # --- Game Page ---
-@app.route("/game")
-def game():
-    if "user_id" not in session:
-        return redirect(url_for("login"))
-    return render_template_string(""" 
-<!DOCTYPE html>
-<html lang="en">
-<head>
-<meta charset="UTF-8">
-<meta name="viewport" content="width=device-width, initial-scale=1.0">
-<title>Aviator Multiplayer</title>
-<script src="https://cdn.socket.io/4.7.1/socket.io.min.js"></script>
-<script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-<style>
+# The page itself is a small shell; its style and script are static assets
+GAME_CSS = """
 body{margin:0;font-family:sans-serif;background:#111;color:#0ff;display:flex;flex-direction:column;align-items:center;}
 h1{margin:20px;}
 .panel-row{display:flex;gap:20px;justify-content:center;margin-bottom:20px;flex-wrap:wrap;}
@@ -241,33 +361,20 @@ button:hover{transform:scale(1.1);box-shadow:0 0 15px #0ff;}
 #message{color:#f00;margin-top:5px;font-weight:bold;}
 canvas{background:#000;border-radius:10px;}
 #plane{position:absolute;top:50%;left:0;width:50px;height:50px;transition: left 0.05s linear;}
-</style>
-</head>
-<body>
-<h1>Welcome, {{session['username']}}</h1>
-<a href="{{url_for('logout')}}">Logout</a>
-
-<div class="panel-row">
-  <div class="panel">
-    <div>Balance: $<span id="balance">0</span></div>
-    <label>Bet $<input type="number" id="betInput" value="100" min="1"></label>
-    <button id="placeBetBtn">Place Bet</button>
-    <div id="currentBet">Current Bet: $0</div>
-  </div>
-  <div class="panel">
-    <div>Multiplier: x<span id="multiplier">1.00</span></div>
-    <div id="message"></div>
-    <button id="cashoutBtn">Cash Out</button>
-  </div>
-</div>
-
-<div style="position:relative;width:800px;height:200px;">
-  <canvas id="historyChart" width="800" height="200"></canvas>
-  <img id="plane" src="https://i.ibb.co/yR7m0qk/plane.png">
-</div>
-
-<script>
-const socket=io();
+"""
+
+GAME_JS = """
+// Reconnects resume the same server session and get only missed events
+let session={token:null,seq:-1};
+const socket=io({auth:cb=>cb({resume:session.token,seq:session.seq})});
+socket.onAny((event,data)=>{
+    if(data && data.seq!==undefined) session.seq=data.seq;
+});
+socket.on("session",data=>{
+    session.token=data.token;
+    balance=data.balance;
+    balanceEl.textContent=balance.toFixed(2);
+});
 let balance=0,currentMultiplier=1,currentBet=0;
 let roundActive=false;
 
@@ -298,16 +405,19 @@ socket.on("new_round",data=>{
     planeEl.style.left="0px";
 });
 
-socket.on("multiplier_update",data=>{
-    currentMultiplier=data.multiplier;
+socket.on("multiplier_update",data=>showMultiplier(data.multiplier));
+
+function showMultiplier(m){
+    currentMultiplier=m;
     multiplierEl.textContent=currentMultiplier.toFixed(2);
     const percent=currentMultiplier/10;
     planeEl.style.left=Math.min(750, percent*800/10)+"px";
-});
+}
 
 socket.on("round_crash",data=>{
     roundActive=false;
     messageEl.textContent="Flew away! x"+data.crash_point.toFixed(2);
+    if(data.stats.streak_below_2x>=3) messageEl.textContent+=` (${data.stats.streak_below_2x} in a row under 2x)`;
     historyData.push(data.crash_point);
     if(historyData.length>50) historyData.shift();
     historyLabels=historyData.map((_,i)=>i+1);
@@ -344,20 +454,88 @@ cashoutBtn.addEventListener("click", ()=>{
         messageEl.textContent="Place a bet first!";
         return;
     }
-    socket.emit("cashout",{"multiplier":currentMultiplier,"bet":currentBet});
+    socket.emit("cashout",{"bet":currentBet});
 });
 function updateChart(){
     historyChart.data.labels=historyLabels;
     historyChart.data.datasets[0].data=historyData;
     historyChart.update();
 }
-</script>
+"""
+
+static = Bundle("/assets")
+game_css = static.add("game.css", GAME_CSS, "text/css")
+game_js = static.add("game.js", GAME_JS, "text/javascript")
+
+GAME = jinja.from_string("""
+<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>Aviator Multiplayer</title>
+<script src="https://cdn.socket.io/4.7.1/socket.io.min.js"></script>
+<script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
+<link rel="stylesheet" href="{{game_css}}">
+</head>
+<body>
+<h1>Welcome, {{session['username']}}</h1>
+<a href="{{url_for('logout')}}">Logout</a>
+
+<div class="panel-row">
+  <div class="panel">
+    <div>Balance: $<span id="balance">0</span></div>
+    <label>Bet $<input type="number" id="betInput" value="100" min="1"></label>
+    <button id="placeBetBtn">Place Bet</button>
+    <div id="currentBet">Current Bet: $0</div>
+  </div>
+  <div class="panel">
+    <div>Multiplier: x<span id="multiplier">1.00</span></div>
+    <div id="message"></div>
+    <button id="cashoutBtn">Cash Out</button>
+  </div>
+</div>
+
+<div style="position:relative;width:800px;height:200px;">
+  <canvas id="historyChart" width="800" height="200"></canvas>
+  <img id="plane" src="https://i.ibb.co/yR7m0qk/plane.png">
+</div>
+
+<script src="{{game_js}}"></script>
 </body>
 </html>
 """)
 
+@app.get("/assets/{name}")
+async def asset(name: str, request: Request):
+    found = static.get(name)
+    if found is None:
+        return Response(status_code=404)
+    return found.response(request.headers)
+
+@app.get("/game")
+async def game(request: Request):
+    if "user_id" not in request.session:
+        return RedirectResponse(app.url_path_for("login"), status_code=302)
+    return HTMLResponse(GAME.render(session=request.session))
+
+# --- Prebuilt pages ---
+# Templates are compiled once at import; pages without per-request content
+# are rendered and compressed once here and answered with 304s on revisit
+HTML = "text/html; charset=utf-8"
+jinja.globals.update(url_for=app.url_path_for, game_css=static.url(game_css), game_js=static.url(game_js))
+PAGES = {
+    "index": Asset("index.html", INDEX_HTML, HTML),
+    "register": Asset("register.html", REGISTER.render(msg=""), HTML),
+    "login": Asset("login.html", LOGIN.render(msg=""), HTML),
+}
+
 # --- Start game ---
-socketio.start_background_task(game_loop)
+@app.on_event("startup")
+async def startup():
+    asyncio.create_task(game_loop())
+    asyncio.create_task(ledger_loop())
 
 if __name__=="__main__":
-    socketio.run(app, host="0.0.0.0", port=5000)
+    import uvicorn
+    uvicorn.run(asgi, host="0.0.0.0", port=5000)
@@ -1,89 +1,140 @@
-from fastapi import FastAPI, WebSocket
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, Request, WebSocket
 import random
 import asyncio
+import json
+import os
+import time
+from history import RoundHistory
+from fairness import HashChain, uniform
+from crash_models import session_crash, session_step
+from ticker import Ticker
+from assets import StaticBuild
+from admission import Gate
+from fanout import Fanout
 
 app = FastAPI()
-app.mount("/static", StaticFiles(directory="static"), name="static")
 
-history = []
+# static/ is fingerprinted and precompressed into dist/static at deploy
+# (see assets.py):  python assets.py build static --out dist/static
+static = StaticBuild(os.environ.get("AVIATOR_STATIC_DIR", "dist/static"))
+
+history = RoundHistory(100)
 round_number = 1
+current_multiplier = 1.0
+tick_number = 0  # bumped every tick; keys per-tick dedupe of inbound frames
+
+START_BALANCE = 1000  # starting coins
+chain = HashChain("session.chain")  # provably-fair round seeds, see fairness.py
+TICK = 0.5  # seconds
 
-user_balance = 1000  # starting coins
+# One Player per socket; the round itself is shared (see round_engine)
+class Player:
+    def __init__(self, ws):
+        self.ws = ws
+        self.balance = START_BALANCE
+        self.bet = 0
+        self.cashed_out = False
 
-with open("static/index.html") as f:
-    html_content = f.read()
+players = {}  # ws -> Player
+fanout = Fanout()  # per-socket queues and writers, see fanout.py
 
 @app.get("/")
-async def get():
-    return HTMLResponse(html_content)
+async def get(request: Request):
+    return static.response("index.html", request.headers)
+
+@app.get("/static/{path:path}")
+async def static_file(path: str, request: Request):
+    return static.response(path, request.headers)
+
+# --- Round engine ---
+# A single task runs every round and ticks whether or not clients send anything
+async def round_engine():
+    global round_number, current_multiplier, tick_number
+    while True:
+        chain_index, round_hash = chain.next()
+        rng = random.Random(round_hash)  # the whole round replays from its hash
+        crash_multiplier = session_crash(uniform(round_hash))
+        current_multiplier = 1.0
+        ticker = Ticker(TICK, time.monotonic() + TICK)
+        while True:
+            await ticker.asleep()
+            tick_number += 1
+            # Late ticks are merged but still take their steps, so the path
+            # stays the one the round hash replays
+            for _ in range(1 + ticker.merged):
+                current_multiplier = round(current_multiplier + session_step(rng), 2)
+            if current_multiplier >= crash_multiplier:
+                break
+            # Queued, never awaited: a slow socket can't hold the tick back
+            fanout.publish({"type": "update", "multiplier": current_multiplier}, droppable=True)
+
+        history.push(crash_multiplier)
+        fanout.publish(json.dumps({
+            "type": "crash",
+            "multiplier": crash_multiplier,
+            "history": history.snapshot(),
+            "hash": round_hash.hex(),
+            "chain_index": chain_index
+        }))
+        round_number += 1
+        current_multiplier = 1.0
+        for player in players.values():
+            player.bet = 0
+            player.cashed_out = False
+        await asyncio.sleep(1)
+        for player in list(players.values()):
+            fanout.send(player.ws, {
+                "type": "reset",
+                "round": round_number,
+                "multiplier": current_multiplier,
+                "history": history.snapshot(),
+                "balance": player.balance
+            })
+
+@app.on_event("startup")
+async def startup_event():
+    asyncio.create_task(round_engine())
 
 @app.websocket("/ws")
 async def websocket_endpoint(ws: WebSocket):
-    global history, round_number, user_balance
     await ws.accept()
+    player = Player(ws)
+    players[ws] = player
+    fanout.add(ws)
 
-    crash_multiplier = round(random.uniform(1.0, 1_000_000.0), 2)
-    current_multiplier = 1.0
-    user_bet = 0
-    cashed_out = False
-
-    await ws.send_json({
+    fanout.send(ws, {
         "type": "init",
         "round": round_number,
-        "history": history,
-        "balance": user_balance
+        "history": history.snapshot(),
+        "balance": player.balance,
+        "commitment": chain.commitment
     })
 
-    while True:
-        try:
+    gate = Gate()  # see admission.py
+    try:
+        while True:
             msg = await ws.receive_json()
-            if msg.get("action") == "deposit":
-                user_balance += float(msg.get("amount", 0))
-                await ws.send_json({"type": "balance_update", "balance": user_balance})
-            elif msg.get("action") == "bet":
+            action = msg.get("action")
+            if not gate.admit(action, tick_number if action in ("bet", "cashout") else None, msg.get("amount")):
+                continue
+            if action == "deposit":
+                player.balance += float(msg.get("amount", 0))
+                fanout.send(ws, {"type": "balance_update", "balance": player.balance})
+            elif action == "bet":
                 bet_amount = float(msg.get("amount", 0))
-                if bet_amount <= user_balance:
-                    user_balance -= bet_amount
-                    user_bet = bet_amount
-                    cashed_out = False
-                await ws.send_json({"type": "balance_update", "balance": user_balance})
-            elif msg.get("action") == "cashout" and not cashed_out:
-                payout = round(user_bet * current_multiplier, 2)
-                user_balance += payout
-                user_bet = 0
-                cashed_out = True
-                await ws.send_json({"type": "balance_update", "balance": user_balance, "cashed_out": payout})
-
-            # update multiplier
-            current_multiplier = round(current_multiplier + random.uniform(0.05, 100.0), 2)
-
-            # crash
-            if current_multiplier >= crash_multiplier:
-                history.append(crash_multiplier)
-                await ws.send_json({
-                    "type": "crash",
-                    "multiplier": crash_multiplier,
-                    "history": history
-                })
-                round_number += 1
-                crash_multiplier = round(random.uniform(1.0, 1_000_000.0), 2)
-                current_multiplier = 1.0
-                user_bet = 0
-                cashed_out = False
-                await asyncio.sleep(1)
-                await ws.send_json({
-                    "type": "reset",
-                    "round": round_number,
-                    "multiplier": current_multiplier,
-                    "history": history,
-                    "balance": user_balance
-                })
-            else:
-                await ws.send_json({"type": "update", "multiplier": current_multiplier})
-
-            await asyncio.sleep(0.5)
-
-        except:
-            break
+                if bet_amount <= player.balance:
+                    player.balance -= bet_amount
+                    player.bet = bet_amount
+                    player.cashed_out = False
+                fanout.send(ws, {"type": "balance_update", "balance": player.balance})
+            elif action == "cashout" and not player.cashed_out:
+                payout = round(player.bet * current_multiplier, 2)
+                player.balance += payout
+                player.bet = 0
+                player.cashed_out = True
+                fanout.send(ws, {"type": "balance_update", "balance": player.balance, "cashed_out": payout})
+    except Exception:
+        pass
+    finally:
+        players.pop(ws, None)
+        fanout.remove(ws)
@@ -0,0 +1,307 @@
+"""Static assets: in-memory pages and a fingerprinted, precompressed file build.
+
+    python assets.py build aviator_web/web aviator_web/assets=assets --out aviator_web/dist
+
+writes every file under a content-hashed name (style.css ->
+style.3f2a...css) with .gz/.br siblings for text types and a manifest.json;
+HTML files are rewritten to reference the hashed names.  Hashed names are
+served with immutable caching, so browsers fetch each version once.  The
+output directory can equally be served by a front proxy (nginx
+gzip_static/brotli_static) to keep static bytes off the game workers
+entirely.  The build being replaced stays servable for GRACE (7 days) after a
+deploy, then its files are pruned.
+
+Building is a deploy step, run once before the servers start: a server only
+loads the finished build (StaticBuild), so any number of workers can share
+one output directory.  $AVIATOR_STATIC_DIR points a server at a build other
+than its default.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import time
+
+from starlette.responses import FileResponse, Response
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only without it
+    brotli = None
+
+# --- Static assets ---
+# An Asset holds a page or file fully built in memory: the raw bytes, a gzip
+# (and brotli, if installed) variant compressed once at startup, and an ETag
+# from the content hash.  Serving one is a header check and a dict lookup:
+# no template rendering or compression per request, and a 304 when the
+# browser already has it.  Fingerprinted assets (url contains the hash)
+# are cached by browsers for a year without revalidation.
+
+MIN_COMPRESS = 256  # bytes; smaller bodies go out as they are
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+COMPRESSIBLE = {".html", ".css", ".js", ".json", ".svg", ".txt", ".map"}  # mp3/png are already compressed
+SUFFIXES = {"br": ".br", "gzip": ".gz"}
+MANIFEST = "manifest.json"
+GRACE = 7*86400  # seconds a superseded build's hashed files stay served
+
+
+def compress(body):
+    variants = {"gzip": gzip.compress(body, 9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=11)
+    return variants
+
+
+def accepted_encodings(header):
+    # Codings from an Accept-Encoding header, ignoring any with q=0
+    codings = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            codings.add(coding.strip().lower())
+    return codings
+
+
+def variant_etag(etag, coding):
+    # Each encoding is a different representation and gets its own ETag
+    if coding is None:
+        return etag
+    return etag[:-1] + SUFFIXES[coding].replace(".", "-") + '"'
+
+
+def smallest(sizes, accept_encoding):
+    # Smallest variant the client accepts; sizes maps coding (None for the
+    # identity body) -> length
+    codings = accepted_encodings(accept_encoding) if accept_encoding else ()
+    best = None
+    for coding, size in sizes.items():
+        if coding is not None and coding not in codings:
+            continue
+        if best is None or size < sizes[best]:
+            best = coding
+    return best
+
+
+class Asset:
+    def __init__(self, name, body, media_type, fingerprint=False):
+        if isinstance(body, str):
+            body = body.encode()
+        digest = hashlib.sha256(body).hexdigest()[:16]
+        self.name = name
+        self.media_type = media_type
+        self.etag = f'"{digest}"'
+        stem, ext = os.path.splitext(name)
+        self.url_name = f"{stem}.{digest}{ext}" if fingerprint else name
+        self.cache_control = IMMUTABLE if fingerprint else REVALIDATE
+        self.variants = {None: body}
+        if len(body) >= MIN_COMPRESS:
+            self.variants.update(compress(body))
+        self.sizes = {coding: len(v) for coding, v in self.variants.items()}
+
+    def response(self, headers):
+        coding = smallest(self.sizes, headers.get("accept-encoding", ""))
+        etag = variant_etag(self.etag, coding)
+        common = {"ETag": etag, "Cache-Control": self.cache_control, "Vary": "Accept-Encoding"}
+        if etag in headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=common)
+        if coding is not None:
+            common["Content-Encoding"] = coding
+        return Response(self.variants[coding], media_type=self.media_type, headers=common)
+
+
+class Bundle:
+    # Assets served under one route, looked up by (fingerprinted) file name
+    def __init__(self, prefix):
+        self.prefix = prefix.rstrip("/")
+        self.assets = {}
+
+    def add(self, name, body, media_type, fingerprint=True):
+        asset = Asset(name, body, media_type, fingerprint)
+        self.assets[asset.url_name] = asset
+        return asset
+
+    def url(self, asset):
+        return f"{self.prefix}/{asset.url_name}"
+
+    def get(self, url_name):
+        return self.assets.get(url_name)
+
+
+# --- Build ---
+REFERENCE = re.compile(rb'((?:src|href)=["\'])([^"\'#?]+)')
+
+
+def fingerprint(name, body):
+    stem, ext = posixpath.splitext(name)
+    return f"{stem}.{hashlib.sha256(body).hexdigest()[:16]}{ext}"
+
+
+def rewrite(name, body, manifest):
+    # Point an HTML file's src/href attributes at the hashed names
+    base = posixpath.dirname(name)
+    def sub(m):
+        target = posixpath.normpath(posixpath.join(base, m.group(2).decode()))
+        hashed = manifest.get(target)
+        if hashed is None:
+            return m.group(0)
+        return m.group(1) + posixpath.relpath(hashed, base or ".").encode()
+    return REFERENCE.sub(sub, body)
+
+
+def write(path, body):
+    # Content-addressed, so an existing file is already right
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(body)
+    os.replace(tmp, path)
+
+
+def build(sources, out):
+    # sources: (directory, url prefix) pairs; returns the manifest
+    files = []
+    for directory, prefix in sources:
+        for root, _, names in os.walk(directory):
+            for filename in names:
+                path = os.path.join(root, filename)
+                rel = os.path.relpath(path, directory).replace(os.sep, "/")
+                files.append((posixpath.join(prefix, rel) if prefix else rel, path))
+    # HTML last so every file it references already has its hashed name
+    files.sort(key=lambda f: f[0].endswith(".html"))
+    manifest = {}
+    for name, path in files:
+        with open(path, "rb") as f:
+            body = f.read()
+        if name.endswith(".html"):
+            body = rewrite(name, body, manifest)
+        hashed = fingerprint(name, body)
+        target = os.path.join(out, hashed)
+        write(target, body)
+        if posixpath.splitext(name)[1] in COMPRESSIBLE and len(body) >= MIN_COMPRESS:
+            for coding, variant in compress(body).items():
+                write(target + SUFFIXES[coding], variant)
+        manifest[name] = hashed
+    os.makedirs(out, exist_ok=True)
+    path = os.path.join(out, MANIFEST)
+    # The build being replaced stays servable for GRACE, so pages already
+    # open in browsers can still load the hashed files they reference
+    previous = load_manifest(path)
+    if previous is not None and previous != manifest:
+        os.replace(path, os.path.join(out, f"manifest-{int(time.time())}.json"))
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+    prune(out)
+    return manifest
+
+
+def load_manifest(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def previous_manifests(out, now=None):
+    # Superseded manifests still within GRACE, newest first
+    now = time.time() if now is None else now
+    found = []
+    for filename in os.listdir(out):
+        m = re.fullmatch(r"manifest-(\d+)\.json", filename)
+        if m and now - int(m.group(1)) < GRACE:
+            found.append((int(m.group(1)), load_manifest(os.path.join(out, filename))))
+    return [manifest for _, manifest in sorted(found, reverse=True)]
+
+
+def prune(out, now=None):
+    # Drops expired manifests and every file no live manifest references
+    now = time.time() if now is None else now
+    for filename in os.listdir(out):
+        m = re.fullmatch(r"manifest-(\d+)\.json", filename)
+        if m and now - int(m.group(1)) >= GRACE:
+            os.remove(os.path.join(out, filename))
+    live = set()
+    for manifest in [load_manifest(os.path.join(out, MANIFEST))] + previous_manifests(out, now):
+        for hashed in manifest.values():
+            live.add(hashed)
+            live.update(hashed + suffix for suffix in SUFFIXES.values())
+    for root, _, names in os.walk(out):
+        for filename in names:
+            rel = os.path.relpath(os.path.join(root, filename), out).replace(os.sep, "/")
+            if rel not in live and not re.fullmatch(r"manifest(-\d+)?\.json", rel):
+                os.remove(os.path.join(root, filename))
+
+
+# --- Serving a build ---
+class StaticBuild:
+    # Serves a build() output directory.  Hashed names get immutable caching;
+    # the original names (and index.html for "") revalidate by ETag.  Hashed
+    # names from builds superseded within GRACE are still served.  Bodies
+    # go out as FileResponses, which handle Range requests and use the
+    # server's zero-copy path where it offers one.
+    def __init__(self, directory, index="index.html"):
+        self.files = {}  # url path -> (path on disk, media type, etag, cache control, sizes)
+        current = load_manifest(os.path.join(directory, MANIFEST))
+        if current is None:
+            raise RuntimeError(f"no static build in {directory}; run python assets.py build ... --out {directory}")
+        for manifest in previous_manifests(directory):
+            for name, hashed in manifest.items():
+                self.add(directory, name, hashed, current=False)
+        for name, hashed in current.items():
+            self.add(directory, name, hashed, current=True)
+        if index in self.files:
+            self.files[""] = self.files[index]
+
+    def add(self, directory, name, hashed, current):
+        path = os.path.join(directory, hashed)
+        if not os.path.exists(path):
+            return
+        media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        etag = '"' + posixpath.splitext(hashed)[0].rsplit(".", 1)[-1] + '"'
+        sizes = {None: os.path.getsize(path)}
+        for coding, suffix in SUFFIXES.items():
+            if os.path.exists(path + suffix):
+                sizes[coding] = os.path.getsize(path + suffix)
+        if current:
+            self.files[name] = (path, media_type, etag, REVALIDATE, sizes)
+        self.files[hashed] = (path, media_type, etag, IMMUTABLE, sizes)
+
+    def response(self, name, headers):
+        found = self.files.get(name.lstrip("/"))
+        if found is None:
+            return Response(status_code=404)
+        path, media_type, etag, cache_control, sizes = found
+        coding = smallest(sizes, headers.get("accept-encoding", ""))
+        etag = variant_etag(etag, coding)
+        common = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if etag in headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=common)
+        if coding is not None:
+            common["Content-Encoding"] = coding
+            path += SUFFIXES[coding]
+        return FileResponse(path, media_type=media_type, headers=common)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fingerprint and precompress static files")
+    sub = parser.add_subparsers(dest="command", required=True)
+    b = sub.add_parser("build")
+    b.add_argument("sources", nargs="+", help="directory, or directory=url-prefix")
+    b.add_argument("--out", required=True)
+    args = parser.parse_args()
+    sources = [tuple(s.split("=", 1)) if "=" in s else (s, "") for s in args.sources]
+    manifest = build(sources, args.out)
+    print(f"{len(manifest)} files -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
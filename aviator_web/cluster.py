@@ -0,0 +1,86 @@
+import asyncio
+import uuid
+
+from redis.exceptions import RedisError
+
+import scripts
+
+# ----------------------
+# Multi-worker coordination
+# ----------------------
+# Exactly one process runs the game loop: the holder of a Redis lock with a
+# TTL, renewed every LEADER_TTL/3.  If the leader dies or stalls, the lock
+# expires and another worker takes over.  The leader publishes every
+# outbound game event on pub/sub; every worker (the leader included) relays
+# what it receives to its own sockets, so clients behave the same whichever
+# worker or node they are connected to.
+
+LEADER_KEY = "game:leader"
+LEADER_TTL = 3000  # ms
+TICKS_CHANNEL = "game:ticks"    # droppable multiplier frames
+EVENTS_CHANNEL = "game:events"  # everything else
+
+NODE_ID = uuid.uuid4().hex
+
+
+async def publish(client, data, droppable=False):
+    await client.publish(TICKS_CHANNEL if droppable else EVENTS_CHANNEL, data)
+
+
+async def relay(client, on_message):
+    # on_message(channel, data, droppable) is called for every published frame
+    while True:
+        pubsub = client.pubsub()
+        try:
+            await pubsub.subscribe(TICKS_CHANNEL, EVENTS_CHANNEL)
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                channel = message["channel"]
+                # A bad frame or a failing handler costs that one message;
+                # only losing the subscription below reconnects
+                try:
+                    await on_message(channel, message["data"], channel == TICKS_CHANNEL)
+                except Exception as e:
+                    print(f"Event relay dropped a message on {channel}: {e!r}")
+        except RedisError as e:
+            print(f"Event relay lost Redis: {e}")
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.aclose()
+
+
+async def lead(client, run):
+    # Run the coroutine function run() whenever this worker holds the lock
+    interval = LEADER_TTL/3000
+    while True:
+        try:
+            acquired = await client.set(LEADER_KEY, NODE_ID, nx=True, px=LEADER_TTL)
+        except RedisError as e:
+            print(f"Leader election failed: {e}")
+            acquired = False
+        if not acquired:
+            await asyncio.sleep(interval)
+            continue
+        task = asyncio.create_task(run())
+        try:
+            while not task.done():
+                await asyncio.sleep(interval)
+                try:
+                    renewed = await scripts.run(client, "renew", [LEADER_KEY], [NODE_ID, LEADER_TTL])
+                except RedisError:
+                    renewed = 0
+                if not renewed:
+                    break
+        finally:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                print(f"Game loop failed: {e}")
+            try:
+                await scripts.run(client, "release", [LEADER_KEY], [NODE_ID])
+            except RedisError:
+                pass
@@ -0,0 +1,69 @@
+from collections import deque
+
+# ----------------------
+# Streaming predictor
+# ----------------------
+# Least-squares line over the last WINDOW round results, kept as running
+# sums so each round costs O(1) instead of a fresh sklearn fit.
+#
+# It reproduces the original ai_predict(): x is the age of a result
+# (0 = newest, as returned by LRANGE on the LPUSHed history) and the
+# prediction is the line evaluated at x = n.  When a new result arrives
+# every age grows by one, which shifts the sums as
+#     Sx += n,  Sxx += 2*Sx + n,  Sxy += Sy
+# and the new result enters at x = 0.
+
+WINDOW = 20
+MIN_SAMPLES = 5
+RESYNC = 1000  # pushes between exact recomputes, to shed float drift
+
+
+class Predictor:
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.values = deque()  # oldest first
+        self.reset()
+
+    def reset(self):
+        self.values.clear()
+        self.n = 0
+        self.sx = self.sxx = self.sy = self.sxy = 0.0
+        self.pushes = 0
+
+    def push(self, y):
+        n = self.n
+        self.sxx += 2*self.sx + n
+        self.sx += n
+        self.sxy += self.sy
+        self.sy += y
+        self.values.append(y)
+        self.n = n + 1
+        if self.n > self.window:
+            old = self.values.popleft()
+            age = self.window
+            self.n -= 1
+            self.sx -= age
+            self.sxx -= age*age
+            self.sy -= old
+            self.sxy -= age*old
+        self.pushes += 1
+        if self.pushes % RESYNC == 0:
+            self._resync()
+
+    def _resync(self):
+        n = self.n
+        self.sx = self.sxx = self.sy = self.sxy = 0.0
+        for i, y in enumerate(self.values):
+            x = n - 1 - i
+            self.sx += x
+            self.sxx += x*x
+            self.sy += y
+            self.sxy += x*y
+
+    def predict(self):
+        n = self.n
+        if n < MIN_SAMPLES:
+            return 1.0  # default prediction
+        slope = (n*self.sxy - self.sx*self.sy)/(n*self.sxx - self.sx*self.sx)
+        intercept = (self.sy - slope*self.sx)/n
+        return intercept + slope*n
@@ -0,0 +1,54 @@
+import random
+import time
+
+# ----------------------
+# Round state
+# ----------------------
+# The multiplier path of a round is fully determined by its seed: every
+# TICK it grows by uniform(0.01, 0.05) drawn from random.Random(seed).  The
+# round clock lives in process and only (round_id, start, seed, ticks) is
+# written to Redis, once per round, so any worker can rebuild the same path
+# and read the multiplier for the current time without a Redis call.
+
+TICK = 0.05  # seconds
+ROUND_KEY = "round"
+
+
+class RoundState:
+    def __init__(self, round_id=0, start=0.0, seed=0, ticks=0):
+        self.round_id = round_id
+        self.start = start
+        self.seed = seed
+        self.ticks = ticks
+        rng = random.Random(seed)
+        multiplier = 1.0
+        self.path = [multiplier]
+        for _ in range(ticks):
+            multiplier += rng.uniform(0.01, 0.05)
+            self.path.append(multiplier)
+
+    @classmethod
+    def new(cls, round_id, ticks):
+        return cls(round_id, time.time(), random.getrandbits(64), ticks)
+
+    @classmethod
+    def from_mapping(cls, data):
+        return cls(int(data["round_id"]), float(data["start"]), int(data["seed"]), int(data["ticks"]))
+
+    def to_mapping(self):
+        return {"round_id": self.round_id, "start": self.start, "seed": self.seed, "ticks": self.ticks}
+
+    def tick_at(self, now):
+        return min(max(int((now - self.start)/TICK), 0), self.ticks)
+
+    def multiplier(self, now=None):
+        return self.path[self.tick_at(time.time() if now is None else now)]
+
+    @property
+    def final(self):
+        return self.path[-1]
+
+
+async def load(client):
+    data = await client.hgetall(ROUND_KEY)
+    return RoundState.from_mapping(data) if data else RoundState()
@@ -0,0 +1,80 @@
+from redis.exceptions import NoScriptError
+
+# ----------------------
+# Server-side Lua scripts
+# ----------------------
+# Each bet/cashout is one EVALSHA round trip and runs atomically inside
+# Redis, as do the compare-and-set operations on the game-loop leader lock.
+# Scripts are loaded once at startup and their SHAs cached; if Redis was
+# restarted and lost its script cache they are reloaded on NOSCRIPT.
+#
+# Bet/cashout replies are {ok, value}; values are returned as strings so
+# fractional payouts survive Lua's integer conversion of numbers.
+
+START_BALANCE = 1000
+
+# KEYS: user hash, betting_open   ARGV: amount, starting balance
+BET = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('HSET', KEYS[1], 'balance', ARGV[2], 'bet', 0, 'cashed_out', 0)
+end
+local balance = tonumber(redis.call('HGET', KEYS[1], 'balance'))
+local amount = tonumber(ARGV[1])
+if amount > balance then
+    return {0, 'Insufficient balance'}
+end
+if redis.call('GET', KEYS[2]) ~= '1' then
+    return {0, 'Betting closed'}
+end
+balance = math.floor(balance - amount)
+redis.call('HSET', KEYS[1], 'balance', balance, 'bet', math.floor(amount), 'cashed_out', 0)
+return {1, tostring(balance)}
+"""
+
+# KEYS: user hash, betting_open   ARGV: multiplier
+# betting_open is 1 while the round runs, so a cashout after the crash fails
+CASHOUT = """
+local user = redis.call('HMGET', KEYS[1], 'balance', 'bet', 'cashed_out')
+if not user[1] or tonumber(user[3]) == 1 then
+    return {0, ''}
+end
+if redis.call('GET', KEYS[2]) ~= '1' then
+    return {0, 'Round over'}
+end
+local multiplier = tonumber(ARGV[1])
+local payout = tonumber(user[2]) * multiplier
+redis.call('HSET', KEYS[1], 'balance', math.floor(tonumber(user[1]) + payout), 'cashed_out', 1)
+return {1, tostring(payout)}
+"""
+
+# KEYS: leader lock   ARGV: node id, ttl ms
+RENEW = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# KEYS: leader lock   ARGV: node id
+RELEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+SCRIPTS = {"bet": BET, "cashout": CASHOUT, "renew": RENEW, "release": RELEASE}
+shas = {}
+
+
+async def load_scripts(client):
+    for name, source in SCRIPTS.items():
+        shas[name] = await client.script_load(source)
+
+
+async def run(client, name, keys, args):
+    try:
+        return await client.evalsha(shas[name], len(keys), *keys, *args)
+    except NoScriptError:
+        await load_scripts(client)
+        return await client.evalsha(shas[name], len(keys), *keys, *args)
@@ -1,15 +1,28 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response
 import asyncio
 import json
-import random
+import os
+import sys
 import time
 import redis.asyncio as redis  # official redis asyncio
-import numpy as np
-from sklearn.linear_model import LinearRegression
+import scripts
+import cluster
+from predictor import Predictor
+from round_state import RoundState, ROUND_KEY, load as load_round
+
+# Modules shared with the other servers live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fanout import Fanout
+from tickproto import TickEncoder
+from history import RoundHistory
+from ticker import Ticker
+from resume import Sessions, ReplayBuffer, sweep
+from admission import Gate
+import metrics
+import assets
 
 app = FastAPI()
-app.mount("/", StaticFiles(directory="web", html=True), name="web")
 
 # ----------------------
 # Redis connection
@@ -17,11 +30,32 @@ app.mount("/", StaticFiles(directory="web", html=True), name="web")
 REDIS_HOST = "localhost"
 REDIS_PORT = 6379
 redis_client = None
+round_state = RoundState()
 
 # ----------------------
 # WebSocket connections
 # ----------------------
-connections = []
+# Local sockets only; game events reach them through cluster.relay
+fanout = Fanout()
+encoder = TickEncoder()
+
+# Resumable sessions on this worker: a client that reconnects with its
+# token and last seq skips the Redis user load and gets only the events it
+# missed (see resume.py).  Event seqs are stamped by the leader, so any
+# worker's replay buffer agrees on them.
+sessions = Sessions()
+replay = ReplayBuffer()
+
+# ----------------------
+# Metrics
+# ----------------------
+TICK_DRIFT = metrics.Histogram("aviator_tick_drift_seconds", "Lateness of each leader tick against its intended time")
+BROADCAST_SECONDS = metrics.Histogram("aviator_broadcast_seconds", "Leader time to publish one game event")
+TICKS_SKIPPED = metrics.Counter("aviator_ticks_skipped", "Late leader ticks merged into the next one")
+FANOUT_SECONDS = metrics.Histogram("aviator_fanout_seconds", "Time to queue one relayed event for all local sockets")
+REDIS_SECONDS = metrics.Histogram("aviator_redis_seconds", "Duration of Redis helper calls (bet, cashout, user, history)")
+metrics.Gauge("aviator_connections", "Sockets connected to this worker", lambda: len(fanout))
+metrics.Gauge("aviator_fanout_dropped_frames", "Ticks dropped or coalesced for slow sockets", lambda: fanout.dropped)
 
 # ----------------------
 # Game settings
@@ -33,42 +67,86 @@ house_edge = 0.02   # optional house edge multiplier
 # ----------------------
 # AI Predictor
 # ----------------------
-def ai_predict(history):
-    if len(history) < 5:
-        return 1.0  # default prediction
-    X = np.arange(len(history)).reshape(-1,1)
-    y = np.array(history)
-    model = LinearRegression().fit(X, y)
-    return float(model.predict([[len(history)]]))
+predictor = Predictor()
+recent = RoundHistory(20)  # last 20 results for round_end, kept by the leader
+
+async def seed_history():
+    global recent
+    values = [float(v) for v in reversed(await redis_client.lrange("history", 0, 19))]
+    recent = RoundHistory(20)
+    recent.extend(values)
+    predictor.reset()
+    for value in values[-predictor.window:]:
+        predictor.push(value)
 
 # ----------------------
 # Helper functions
 # ----------------------
-async def broadcast(message: dict):
-    for ws in connections:
-        try:
-            await ws.send_text(json.dumps(message))
-        except:
-            connections.remove(ws)
+async def broadcast(message: dict, droppable=False):
+    await cluster.publish(redis_client, json.dumps(message), droppable)
+
+async def on_game_event(channel, data, droppable):
+    global round_state
+    message = json.loads(data)
+    if droppable:
+        # Ticks are packed once per worker for clients on the binary protocol
+        t0 = time.perf_counter()
+        replay.add(message["seq"], data, tick=True)
+        fanout.publish(data, True, encoder.encode(message["multiplier"]))
+        FANOUT_SECONDS.observe(time.perf_counter() - t0)
+        return
+    if message["action"] == "round_start":
+        round_state = await load_round(redis_client)
+        encoder.start(round_state.round_id)
+        replay.start_round()
+    replay.add(message["seq"], data)
+    t0 = time.perf_counter()
+    fanout.publish(data)
+    FANOUT_SECONDS.observe(time.perf_counter() - t0)
 
 async def init_redis():
     global redis_client
     redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
+    await scripts.load_scripts(redis_client)
 
 async def get_user(user_id):
-    user = await redis_client.hgetall(f"user:{user_id}")
-    if not user:
-        await redis_client.hset(f"user:{user_id}", mapping={"balance":1000,"bet":0,"cashed_out":0})
-        user = await redis_client.hgetall(f"user:{user_id}")
+    key = f"user:{user_id}"
+    t0 = time.perf_counter()
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.hsetnx(key, "balance", scripts.START_BALANCE)
+        pipe.hsetnx(key, "bet", 0)
+        pipe.hsetnx(key, "cashed_out", 0)
+        pipe.hgetall(key)
+        user = (await pipe.execute())[-1]
+    REDIS_SECONDS.observe(time.perf_counter() - t0)
     return {k:int(v) for k,v in user.items()}
 
-async def update_user(user_id, field, value):
-    await redis_client.hset(f"user:{user_id}", field, int(value))
+async def place_bet(user_id, amount):
+    t0 = time.perf_counter()
+    ok, value = await scripts.run(redis_client, "bet", [f"user:{user_id}", "betting_open"],
+                                  [amount, scripts.START_BALANCE])
+    REDIS_SECONDS.observe(time.perf_counter() - t0)
+    return ok == 1, value
 
-async def add_history(multiplier):
-    await redis_client.lpush("history", multiplier)
-    await redis_client.ltrim("history", 0, 99)  # keep last 100 rounds
-    return await redis_client.lrange("history", 0, 19)  # return last 20
+async def cash_out(user_id):
+    multiplier = round_state.multiplier()
+    t0 = time.perf_counter()
+    ok, value = await scripts.run(redis_client, "cashout", [f"user:{user_id}", "betting_open"], [multiplier])
+    REDIS_SECONDS.observe(time.perf_counter() - t0)
+    return ok == 1, value
+
+async def end_round(multiplier):
+    # Closing betting and recording the crash point is one MULTI, as is the
+    # round start, so a reader (export.py) always sees a history list that
+    # matches the round id and betting_open next to it
+    t0 = time.perf_counter()
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.set("betting_open",0)
+        pipe.lpush("history", multiplier)
+        pipe.ltrim("history", 0, 99)  # keep last 100 rounds
+        await pipe.execute()
+    REDIS_SECONDS.observe(time.perf_counter() - t0)
+    recent.push(multiplier)
 
 # ----------------------
 # WebSocket endpoint
@@ -76,72 +154,114 @@ async def add_history(multiplier):
 @app.websocket("/ws")
 async def websocket_endpoint(ws: WebSocket):
     await ws.accept()
-    connections.append(ws)
+    fanout.add(ws)
     user_id = None
+    token = None
+    # Rate limit and per-tick dedupe before any Redis call (see admission.py);
+    # replay.seq moves on every tick
+    gate = Gate()
     try:
         while True:
             data = await ws.receive_text()
             msg = json.loads(data)
+            action = msg["action"]
+            if not gate.admit(action, replay.seq if action in ("bet", "cashout") else None, msg.get("amount")):
+                continue
 
-            if msg["action"] == "register":
+            if action == "register":
                 user_id = msg["user_id"]
-                user = await get_user(user_id)
-                await ws.send_text(json.dumps({"action":"update_balance","balance":user["balance"]}))
+                binary = msg.get("proto") == "bin"
+                if binary:
+                    fanout.set_binary(ws)
+                state = sessions.get(msg.get("resume"))
+                missed = None
+                if state is not None and state["user_id"] == user_id:
+                    token = msg["resume"]
+                    sessions.resume(token)
+                    missed = replay.since(msg.get("seq", -1))
+                    if state["ws"] is not None and state["ws"] is not ws:
+                        # The old socket hasn't noticed it's gone yet
+                        fanout.remove(state["ws"])
+                        asyncio.create_task(state["ws"].close())
+                else:
+                    state = {"user_id": user_id}
+                    token = sessions.open(state)
+                state["ws"] = ws
+                fanout.send(ws, {"action":"session","token":token,"resumed":missed is not None})
+                if missed is None:
+                    user = await get_user(user_id)
+                    fanout.send(ws, {"action":"update_balance","balance":user["balance"]})
+                    continue
+                for event in missed:
+                    tick = json.loads(event)["action"] == "update_multiplier"
+                    fanout.send(ws, encoder.key if tick and binary else event)
 
-            elif msg["action"] == "bet" and user_id:
-                user = await get_user(user_id)
+            elif action == "bet" and user_id:
                 amount = msg["amount"]
-                betting_open = await redis_client.get("betting_open")
-                if amount > user["balance"]:
-                    await ws.send_text(json.dumps({"action":"error","message":"Insufficient balance"}))
+                ok, value = await place_bet(user_id, amount)
+                if not ok:
+                    fanout.send(ws, {"action":"error","message":value})
                     continue
-                if betting_open != "1":
-                    await ws.send_text(json.dumps({"action":"error","message":"Betting closed"}))
-                    continue
-                await update_user(user_id, "balance", user["balance"]-amount)
-                await update_user(user_id, "bet", amount)
-                await update_user(user_id, "cashed_out", 0)
-                await ws.send_text(json.dumps({"action":"bet_confirmed","amount":amount}))
-
-            elif msg["action"] == "cashout" and user_id:
-                user = await get_user(user_id)
-                if user["cashed_out"] == 1:
+                gate.open("cashout")
+                fanout.send(ws, {"action":"bet_confirmed","amount":amount})
+
+            elif action == "cashout" and user_id:
+                ok, value = await cash_out(user_id)
+                # Paid or already cashed out: either way nothing more to cash
+                # until the next bet
+                gate.close("cashout")
+                if not ok:
                     continue
-                multiplier = float(await redis_client.get("current_multiplier"))
-                payout = user["bet"] * multiplier
-                await update_user(user_id, "balance", user["balance"] + payout)
-                await update_user(user_id, "cashed_out", 1)
-                await ws.send_text(json.dumps({"action":"cashed_out","payout":payout}))
+                fanout.send(ws, {"action":"cashed_out","payout":float(value)})
 
     except WebSocketDisconnect:
-        connections.remove(ws)
+        pass
+    finally:
+        fanout.remove(ws)
+        state = sessions.get(token)
+        if state is not None and state["ws"] is ws:
+            state["ws"] = None
+            sessions.detach(token)
 
 # ----------------------
 # Game loop
 # ----------------------
+# Runs only on the worker holding the leader lock (see cluster.py)
 async def game_loop():
+    state = await load_round(redis_client)
+    await seed_history()
     while True:
         # Start round
-        await redis_client.set("betting_open",1)
-        await redis_client.set("current_multiplier",1.0)
-        await broadcast({"action":"round_start","duration":round_duration})
-
-        multiplier = 1.0
         ticks = int(round_duration*20)  # 50ms ticks
-        for _ in range(ticks):
-            await asyncio.sleep(0.05)
-            multiplier += random.uniform(0.01,0.05)  # house edge
-            await redis_client.set("current_multiplier", multiplier)
-            await broadcast({"action":"update_multiplier","multiplier":round(multiplier,2)})
+        state = RoundState.new(state.round_id + 1, ticks)
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.set("betting_open",1)
+            pipe.hset(ROUND_KEY, mapping=state.to_mapping())
+            await pipe.execute()
+        # Event seqs for session resume; round ids come from Redis, so seqs
+        # keep increasing when another worker takes over as leader
+        seq = state.round_id << 16
+        await broadcast({"action":"round_start","duration":round_duration,"seq":seq})
+
+        # Steady 50ms cadence on absolute deadlines (see ticker.py); late
+        # ticks merge, and the multiplier is read from the round clock anyway
+        ticker = Ticker(0.05, time.monotonic() + 0.05)
+        while await ticker.asleep() < ticks:
+            TICK_DRIFT.observe(ticker.lag)
+            TICKS_SKIPPED.inc(ticker.merged)
+            t0 = time.perf_counter()
+            seq += 1
+            await broadcast({"action":"update_multiplier","multiplier":round(state.multiplier(),2),"seq":seq}, droppable=True)
+            BROADCAST_SECONDS.observe(time.perf_counter() - t0)
+        multiplier = state.final
 
         # End round
-        await redis_client.set("betting_open",0)
-        last20 = await add_history(multiplier)
+        await end_round(multiplier)
         # AI Predictor
-        history_floats = list(map(float,last20))
-        prediction = ai_predict(history_floats)
+        predictor.push(multiplier)
+        prediction = predictor.predict()
         await broadcast({"action":"round_end","final_multiplier":round(multiplier,2),
-                         "history":history_floats,"prediction":round(prediction,2)})
+                         "history":recent.snapshot(newest_first=True),"prediction":round(prediction,2),"seq":seq+1})
 
         await asyncio.sleep(round_interval)
 
@@ -150,6 +270,27 @@ async def game_loop():
 # ----------------------
 @app.on_event("startup")
 async def startup_event():
+    global round_state
     await init_redis()
-    asyncio.create_task(game_loop())
+    round_state = await load_round(redis_client)
+    asyncio.create_task(cluster.relay(redis_client, on_game_event))
+    asyncio.create_task(cluster.lead(redis_client, game_loop))
+    asyncio.create_task(sweep(sessions))
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+# ----------------------
+# Static files
+# ----------------------
+# web/ and assets/ are fingerprinted and precompressed into dist/ at deploy,
+# before the workers start (see assets.py):
+#     python ../assets.py build web assets=assets --out dist
+static = assets.StaticBuild(os.environ.get("AVIATOR_STATIC_DIR", "dist"))
+
+# Registered last: the catch-all path must not shadow /metrics
+@app.get("/{path:path}")
+async def static_file(path: str, request: Request):
+    return static.response(path, request.headers)
 
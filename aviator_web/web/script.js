@@ -1,7 +1,7 @@
 // -----------------------
 // WebSocket connection
 // -----------------------
-const ws = new WebSocket(`ws://${window.location.host}/ws`);
+let ws;
 let userId = 'user_' + Math.floor(Math.random()*1000000); // temporary unique user id
 let balance = 1000;
 let currentMultiplier = 1.0;
@@ -9,6 +9,8 @@ let roundActive = false;
 let currentBet = 0;
 let cashoutEnabled = false;
 let history = [];
+let tick = {round: null, seq: null, value: null}; // binary tick decoder state
+let session = {token: null, seq: -1}; // resume token and last event seq seen
 
 // DOM elements
 const canvas = document.getElementById('gameCanvas');
@@ -28,14 +30,53 @@ let planeY = canvas.height - 100;
 // -----------------------
 // WebSocket events
 // -----------------------
-ws.onopen = () => {
-    ws.send(JSON.stringify({action:"register", user_id:userId}));
-};
+// A dropped socket reconnects after 1-3s (jittered so a server blip doesn't
+// bring every client back at once) and resumes its session, getting only
+// the events it missed.
+function connect(){
+    ws = new WebSocket(`ws://${window.location.host}/ws`);
+    ws.binaryType = 'arraybuffer';
+    ws.onopen = () => {
+        ws.send(JSON.stringify({action:"register", user_id:userId, proto:"bin",
+                                resume:session.token, seq:session.seq}));
+    };
+    ws.onmessage = onMessage;
+    ws.onclose = () => setTimeout(connect, 1000 + Math.random()*2000);
+}
+
+// Binary ticks: [op u8][round u32][seq u16][delta i16 | value u32], little endian.
+// op 1 is a delta on the previous tick, op 2 a key frame; after a gap in seq
+// wait for the next key frame.
+function decodeTick(buf){
+    const v = new DataView(buf);
+    const op = v.getUint8(0), round = v.getUint32(1, true), seq = v.getUint16(5, true);
+    if(op === 2){
+        tick.value = v.getUint32(7, true);
+    } else if(op === 1 && tick.value !== null && round === tick.round && seq === ((tick.seq + 1) & 0xffff)){
+        tick.value += v.getInt16(7, true);
+    } else {
+        tick.value = null;
+        return null;
+    }
+    tick.round = round;
+    tick.seq = seq;
+    return tick.value / 100;
+}
 
-ws.onmessage = (event) => {
+function onMessage(event){
+    if(event.data instanceof ArrayBuffer){
+        const m = decodeTick(event.data);
+        if(m !== null) currentMultiplier = m;
+        return;
+    }
     const msg = JSON.parse(event.data);
+    if(msg.seq !== undefined) session.seq = msg.seq;
 
     switch(msg.action){
+        case "session":
+            session.token = msg.token;
+            break;
+
         case "update_balance":
             balance = msg.balance;
             balanceEl.textContent = `Balance: $${balance.toFixed(2)}`;
@@ -76,7 +117,9 @@ ws.onmessage = (event) => {
             cashoutEnabled = false;
             break;
     }
-};
+}
+
+connect();
 
 // -----------------------
 // Betting events
@@ -0,0 +1,309 @@
+"""Load generator and latency benchmark for the WebSocket game servers.
+
+Opens N simulated players against one of the servers, drives a realistic
+bet/cashout schedule for a fixed duration and writes a JSON report:
+
+    python bench/loadgen.py aviator_web ws://localhost:8000/ws -n 2000 -d 60 \\
+        --pid $(pgrep -f "uvicorn server:app") --out report.json
+
+Targets:
+    aviator_web  aviator_web/server.py (register/bet/cashout actions)
+    rounds       main.py, the shared Round engine (place_bet/cash_out)
+    session      app_module.py (action/type protocol with init/update/crash)
+
+Report fields:
+    tick_interval_ms   gaps between consecutive ticks seen by one player;
+                       jitter is their standard deviation
+    fanout_spread_ms   delay between the first and each later player
+                       receiving the same tick frame
+    cashout_rtt_ms     cashout request to acknowledgement (not available
+                       for 'rounds', which does not acknowledge cashouts)
+    server             CPU and RSS of --pid, sampled every second
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+
+import psutil
+import websockets
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tickproto import TickDecoder
+
+
+def percentiles(values, points=(50, 90, 99)):
+    if not values:
+        return None
+    values = sorted(values)
+    out = {f"p{p}": values[min(len(values) - 1, math.ceil(p/100*len(values)) - 1)] for p in points}
+    out["mean"] = sum(values)/len(values)
+    out["max"] = values[-1]
+    out["count"] = len(values)
+    return out
+
+
+def stdev(values):
+    if len(values) < 2:
+        return None
+    mean = sum(values)/len(values)
+    return math.sqrt(sum((v - mean)**2 for v in values)/(len(values) - 1))
+
+
+# --- Shared measurements ---
+class Stats:
+    def __init__(self):
+        self.connected = 0
+        self.errors = 0
+        self.messages = 0
+        self.bytes = 0
+        self.intervals = []
+        self.spread = []
+        self.rtt = []
+        self.first_seen = {}  # tick frame -> first arrival
+
+    def tick(self, frame, now):
+        first = self.first_seen.get(frame)
+        if first is None or now - first > 1.0:
+            self.first_seen[frame] = now
+            if len(self.first_seen) > 10000:
+                self.first_seen.clear()
+        else:
+            self.spread.append((now - first)*1000)
+
+
+# --- Players ---
+class Player:
+    # One simulated player; subclasses speak each server's protocol
+    def __init__(self, stats, binary):
+        self.stats = stats
+        self.binary = binary
+        self.decoder = TickDecoder()
+        self.ws = None
+        self.last_tick = None
+        self.bet = 0
+        self.target = None
+        self.cashout_sent = None
+
+    def new_target(self):
+        # Most players leave early, a few chase long multipliers
+        self.target = 1.1 + random.expovariate(1/1.5)
+        self.cashout_sent = None
+
+    async def send(self, message):
+        await self.ws.send(json.dumps(message))
+
+    async def on_open(self):
+        pass
+
+    async def on_message(self, msg, now):
+        pass
+
+    async def on_tick(self, multiplier, now):
+        pass
+
+    def record_tick(self, frame, now):
+        if self.last_tick is not None:
+            self.stats.intervals.append((now - self.last_tick)*1000)
+        self.last_tick = now
+        self.stats.tick(frame, now)
+
+    def record_cashout(self, now):
+        if self.cashout_sent is not None:
+            self.stats.rtt.append((now - self.cashout_sent)*1000)
+            self.cashout_sent = None
+
+    async def run(self, url, deadline):
+        try:
+            async with websockets.connect(url, max_queue=None) as ws:
+                self.ws = ws
+                self.stats.connected += 1
+                await self.on_open()
+                while True:
+                    timeout = deadline - time.perf_counter()
+                    if timeout <= 0:
+                        return
+                    try:
+                        raw = await asyncio.wait_for(ws.recv(), timeout)
+                    except asyncio.TimeoutError:
+                        return
+                    now = time.perf_counter()
+                    self.stats.messages += 1
+                    self.stats.bytes += len(raw)
+                    if isinstance(raw, bytes):
+                        self.record_tick(raw, now)
+                        multiplier = self.decoder.decode(raw)
+                        if multiplier is not None:
+                            await self.on_tick(multiplier, now)
+                    else:
+                        await self.on_message(json.loads(raw), now)
+        except Exception:
+            self.stats.errors += 1
+
+
+class AviatorWebPlayer(Player):
+    async def on_open(self):
+        message = {"action": "register", "user_id": f"bench_{id(self)}"}
+        if self.binary:
+            message["proto"] = "bin"
+        await self.send(message)
+
+    async def on_message(self, msg, now):
+        action = msg.get("action")
+        if action == "update_multiplier":
+            self.record_tick(json.dumps(msg), now)
+            await self.on_tick(msg["multiplier"], now)
+        elif action == "round_start":
+            self.bet = 0
+            self.new_target()
+            await self.send({"action": "bet", "amount": random.randint(1, 20)})
+        elif action == "bet_confirmed":
+            self.bet = msg["amount"]
+        elif action == "cashed_out":
+            self.record_cashout(now)
+            self.bet = 0
+
+    async def on_tick(self, multiplier, now):
+        if self.bet and self.cashout_sent is None and multiplier >= self.target:
+            self.cashout_sent = now
+            await self.send({"action": "cashout"})
+
+
+class RoundsPlayer(Player):
+    async def on_open(self):
+        if self.binary:
+            await self.send({"type": "hello", "proto": "bin"})
+        await self.place_bet()
+
+    async def place_bet(self, delay=0):
+        await asyncio.sleep(delay)
+        self.new_target()
+        self.bet = random.randint(1, 20)
+        await self.send({"type": "place_bet", "bet": self.bet})
+
+    async def on_message(self, msg, now):
+        if msg.get("type") != "round_update":
+            return
+        if msg["roundOver"]:
+            self.bet = 0
+            asyncio.create_task(self.place_bet(delay=random.uniform(0, 1)))
+        else:
+            self.record_tick(json.dumps(msg), now)
+            await self.on_tick(msg["multiplier"], now)
+
+    async def on_tick(self, multiplier, now):
+        if self.bet and self.target and multiplier >= self.target:
+            self.target = None
+            await self.send({"type": "cash_out"})
+
+
+class SessionPlayer(Player):
+    async def on_open(self):
+        self.new_target()
+
+    async def on_message(self, msg, now):
+        kind = msg.get("type")
+        if kind == "update":
+            self.record_tick(json.dumps(msg), now)
+            await self.on_tick(msg["multiplier"], now)
+            return
+        if kind == "balance_update" and "cashed_out" in msg:
+            self.record_cashout(now)
+            self.bet = 0
+        if kind in ("init", "reset"):
+            self.new_target()
+            self.bet = random.randint(1, 20)
+            await self.send({"action": "bet", "amount": self.bet})
+        elif kind == "crash":
+            self.bet = 0
+
+    async def on_tick(self, multiplier, now):
+        if self.bet and self.cashout_sent is None and multiplier >= self.target:
+            self.cashout_sent = now
+            await self.send({"action": "cashout"})
+
+
+TARGETS = {"aviator_web": AviatorWebPlayer, "rounds": RoundsPlayer, "session": SessionPlayer}
+
+
+# --- Server process sampling ---
+async def sample_process(pid, deadline, cpu, rss):
+    proc = psutil.Process(pid)
+    procs = [proc] + proc.children(recursive=True)
+    for p in procs:
+        p.cpu_percent(None)
+    while time.perf_counter() < deadline:
+        await asyncio.sleep(1)
+        try:
+            cpu.append(sum(p.cpu_percent(None) for p in procs))
+            rss.append(sum(p.memory_info().rss for p in procs)/2**20)
+        except psutil.Error:
+            return
+
+
+async def run(args):
+    stats = Stats()
+    player_cls = TARGETS[args.target]
+    start = time.perf_counter()
+    deadline = start + args.ramp + args.duration
+    cpu, rss = [], []
+    tasks = []
+    if args.pid:
+        tasks.append(asyncio.create_task(sample_process(args.pid, deadline, cpu, rss)))
+    for i in range(args.players):
+        player = player_cls(stats, args.binary)
+        tasks.append(asyncio.create_task(player.run(args.url, deadline)))
+        if args.ramp:
+            await asyncio.sleep(args.ramp/args.players)
+    await asyncio.gather(*tasks)
+
+    return {
+        "target": args.target,
+        "url": args.url,
+        "players": args.players,
+        "binary": args.binary,
+        "duration_s": args.duration,
+        "started_at": time.time() - (time.perf_counter() - start),
+        "connected": stats.connected,
+        "errors": stats.errors,
+        "messages": stats.messages,
+        "bytes": stats.bytes,
+        "tick_interval_ms": percentiles(stats.intervals),
+        "tick_jitter_ms": stdev(stats.intervals),
+        "fanout_spread_ms": percentiles(stats.spread),
+        "cashout_rtt_ms": percentiles(stats.rtt),
+        "server": {
+            "pid": args.pid,
+            "cpu_percent": percentiles(cpu),
+            "rss_mb": percentiles(rss),
+        } if args.pid else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("target", choices=sorted(TARGETS))
+    parser.add_argument("url", help="WebSocket URL, e.g. ws://localhost:8000/ws")
+    parser.add_argument("-n", "--players", type=int, default=1000)
+    parser.add_argument("-d", "--duration", type=float, default=30, help="seconds after ramp-up")
+    parser.add_argument("--ramp", type=float, default=5, help="seconds to open all connections over")
+    parser.add_argument("--binary", action="store_true", help="negotiate the binary tick protocol")
+    parser.add_argument("--pid", type=int, help="server process to sample CPU/RSS from")
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
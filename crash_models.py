@@ -0,0 +1,54 @@
+# --- Crash models ---
+# The outcome rules of each server, expressed over a uniform u in [0, 1) or a
+# seeded random.Random so rounds can be driven (and replayed) from the
+# provably-fair hash chain in fairness.py.
+
+# app.py: crash point drawn once per round
+APP_HOUSE_EDGE = 0.85
+
+def app_crash(u):
+    # Works on floats and numpy arrays alike
+    return 1 + (u*30)**1.5 * APP_HOUSE_EDGE
+
+
+# app_module.py: crash point uniform in [1, 1e6], path steps of 0.05-100x
+SESSION_MIN, SESSION_MAX = 1.0, 1_000_000.0
+
+def session_crash(u):
+    return round(SESSION_MIN + (SESSION_MAX - SESSION_MIN)*u, 2)
+
+def session_step(rng):
+    return rng.uniform(0.05, 100.0)
+
+
+# main.py: no crash point; a multiplicative walk with a per-tick house edge
+WALK_HOUSE_EDGE = 0.02
+
+def walk_step(multiplier, rng):
+    growth = rng.uniform(0.01, 0.15)
+    # Rare chance for high multiplier
+    if rng.random() < 0.05: growth *= 3
+    multiplier *= (1 + growth)
+    return multiplier - multiplier * WALK_HOUSE_EDGE
+
+
+# --- Vectorized forms ---
+# Same rules over numpy arrays, one element per round, for batch
+# verification and the Monte Carlo simulator.  rng is a numpy Generator.
+
+def session_crash_array(u):
+    import numpy as np
+    return np.round(SESSION_MIN + (SESSION_MAX - SESSION_MIN)*u, 2)
+
+def session_step_array(rng, n):
+    return rng.uniform(0.05, 100.0, n)
+
+def walk_step_array(multiplier, rng):
+    n = len(multiplier)
+    growth = rng.uniform(0.01, 0.15, n)
+    growth[rng.random(n) < 0.05] *= 3
+    multiplier = multiplier * (1 + growth)
+    return multiplier - multiplier * WALK_HOUSE_EDGE
+
+# Crash point from an array of uniforms, for batch verification
+VECTOR_MODELS = {"app": app_crash, "session": session_crash_array}
@@ -0,0 +1,45 @@
+import math
+
+# --- Multiplier curve ---
+# The game advances the multiplier once per TICK with
+#     m[k+1] = m[k] + 0.01*(1 + m[k]/10) = GROWTH*m[k] + 0.01,  m[0] = 1
+# whose fixed point is -10, giving the closed form
+#     m[k] = 11*GROWTH**k - 10
+# so both the multiplier at any time and the tick a round crashes on can be
+# computed directly instead of stepping the recurrence every tick.
+
+TICK = 0.05  # seconds per curve step
+GROWTH = 1.001
+_LOG_GROWTH = math.log(GROWTH)
+
+
+def multiplier_at_tick(k):
+    return 11*math.exp(_LOG_GROWTH*k) - 10
+
+
+def crash_tick(crash_point):
+    # First tick whose multiplier reaches crash_point (the old loop always
+    # stepped at least once before checking)
+    k = math.ceil(math.log((crash_point + 10)/11)/_LOG_GROWTH)
+    if k > 1 and multiplier_at_tick(k - 1) >= crash_point:
+        k -= 1
+    return max(k, 1)
+
+
+class Schedule:
+    __slots__ = ("start", "crash_point", "crash_ticks", "crash_at")
+
+    def __init__(self, start, crash_point):
+        self.start = start
+        self.crash_point = crash_point
+        self.crash_ticks = crash_tick(crash_point)
+        self.crash_at = start + self.crash_ticks*TICK
+
+    def tick(self, now):
+        return min(int((now - self.start)/TICK), self.crash_ticks)
+
+    def multiplier(self, now):
+        return multiplier_at_tick(self.tick(now))
+
+    def crashed(self, now):
+        return now >= self.crash_at
@@ -0,0 +1,296 @@
+"""Export rounds and bets to columnar files and report on them.
+
+    python export.py export --db aviator.db --redis localhost:6379 --out analytics
+    python export.py report --out analytics
+
+export appends everything new since the last run: app.py's rounds and
+bets tables (from aviator.db) and aviator_web's Redis history list.
+Each column is a .npy file under <out>/<table>/, and <out>/meta.json
+records how many rows each table holds and the last id exported.  The
+database must be at schema v2 or later (see migrations.py; app.py migrates
+it on start): export refuses older ones rather than guess at their tables.
+Exports made before v2 hold a cashouts/ table instead of bets/; the first
+export after the upgrade deletes it, since v2's bets keep the cashout ids
+and are exported again from the start.  SQLite is
+read in CHUNK-row primary-key ranges on a read-only connection.  No
+statement scans the whole table, and the live server's writes are never
+blocked for long.  Run it from cron, or with --every N to append as rounds
+finish.
+
+report memory-maps the columns and computes, vectorized over them:
+
+    rtp by day     paid / staked for the bets of each day's rounds
+    multipliers    cashout multiplier distribution and percentiles
+    user P&L       staked, paid and net per user (the player's side)
+
+Amounts are stored in cents (see migrations.py) and reported in dollars.
+"""
+import argparse
+import io
+import json
+import os
+import shutil
+import sqlite3
+import time
+
+import numpy as np
+from numpy.lib import format as npy
+
+import migrations
+
+try:
+    import redis
+except ImportError:  # optional: SQLite tables only without it
+    redis = None
+
+CHUNK = 65536  # rows per SELECT
+META = "meta.json"
+DAY = 86400
+
+# table -> columns and their dtypes; "id" is the watermark column
+TABLES = {
+    "rounds": [("id", "i8"), ("crash_point", "f8"), ("timestamp", "f8")],
+    "bets": [("id", "i8"), ("user_id", "i8"), ("round_id", "i8"), ("stake", "i8"), ("multiplier", "f8"), ("payout", "i8")],
+}
+HISTORY = [("round_id", "i8"), ("crash_point", "f8")]  # aviator_web's Redis list
+SCHEMA = 2  # first schema version with these tables
+LEGACY = ["cashouts"]  # tables of exports made before SCHEMA
+
+
+# --- Column store ---
+def append_column(path, values, rows):
+    # Appends values after the first `rows` rows of a .npy file in place:
+    # the data goes on the end and the header's shape is rewritten.  Rows
+    # past `rows` (left by an interrupted run) are overwritten.
+    if rows == 0 or not os.path.exists(path):
+        with open(path, "wb") as f:
+            np.save(f, values)
+        return
+    with open(path, "r+b") as f:
+        npy.read_magic(f)
+        _, _, dtype = npy.read_array_header_1_0(f)
+        offset = f.tell()
+        header = io.BytesIO()
+        npy.write_array_header_1_0(header, {"descr": npy.dtype_to_descr(dtype), "fortran_order": False,
+                                            "shape": (rows + len(values),)})
+        if header.tell() == offset:
+            f.seek(offset + rows*dtype.itemsize)
+            f.write(np.ascontiguousarray(values, dtype).tobytes())
+            f.truncate()
+            f.seek(0)
+            f.write(header.getvalue())
+            return
+    # The header outgrew its padding: rewrite the file once
+    merged = np.concatenate([np.load(path)[:rows], values.astype(dtype)])
+    with open(path + ".tmp", "wb") as f:
+        np.save(f, merged)
+    os.replace(path + ".tmp", path)
+
+
+class Store:
+    def __init__(self, out):
+        self.out = out
+        os.makedirs(out, exist_ok=True)
+        try:
+            with open(os.path.join(out, META)) as f:
+                self.meta = json.load(f)
+        except FileNotFoundError:
+            self.meta = {}  # table -> {"rows": n, "last": watermark}
+
+    def watermark(self, table):
+        return self.meta.get(table, {}).get("last", 0)
+
+    def append(self, table, columns, last):
+        # columns: name -> array, all the same length
+        info = self.meta.get(table, {"rows": 0, "last": 0})
+        os.makedirs(os.path.join(self.out, table), exist_ok=True)
+        n = 0
+        for name, values in columns.items():
+            append_column(os.path.join(self.out, table, name + ".npy"), values, info["rows"])
+            n = len(values)
+        # Committed only once every column is written
+        self.meta[table] = {"rows": info["rows"] + n, "last": last}
+        self.save()
+
+    def drop(self, table):
+        del self.meta[table]
+        self.save()
+        shutil.rmtree(os.path.join(self.out, table), ignore_errors=True)
+
+    def save(self):
+        tmp = os.path.join(self.out, META + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.meta, f, indent=1)
+        os.replace(tmp, os.path.join(self.out, META))
+
+    def columns(self, table):
+        # name -> read-only memmap; empty arrays for a table never exported
+        spec = TABLES.get(table, HISTORY)
+        rows = self.meta.get(table, {}).get("rows", 0)
+        if not rows:
+            return {name: np.empty(0, dtype) for name, dtype in spec}
+        return {name: np.load(os.path.join(self.out, table, name + ".npy"), mmap_mode="r")[:rows]
+                for name, _ in spec}
+
+
+# --- Export ---
+def export_sqlite(store, path):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        current = migrations.version(conn)
+        if current < SCHEMA:
+            raise RuntimeError(f"{path} is at schema v{current}, export needs v{SCHEMA}: "
+                               "start app.py once to migrate it")
+        for table in LEGACY:
+            if table in store.meta:
+                store.drop(table)
+        counts = {}
+        for table, spec in TABLES.items():
+            # NULL ints come out as -1, NULL reals as nan
+            exprs = ", ".join(name if dtype == "f8" or name == "id" else f"IFNULL({name},-1)" for name, dtype in spec)
+            sql = f"SELECT {exprs} FROM {table} WHERE id>? ORDER BY id LIMIT {CHUNK}"
+            counts[table] = 0
+            while True:
+                rows = conn.execute(sql, (store.watermark(table),)).fetchall()
+                if not rows:
+                    break
+                columns = {name: np.array(col, dtype) for (name, dtype), col in zip(spec, zip(*rows))}
+                store.append(table, columns, int(columns["id"][-1]))
+                counts[table] += len(rows)
+    finally:
+        conn.close()
+    return counts
+
+
+def export_redis(store, address):
+    # The history list holds the last 100 crash points, newest first, with
+    # no ids; the newest belongs to the round in the round hash unless that
+    # round is still running (betting open).  The leader changes all three
+    # in MULTIs (see aviator_web/server.py), and they are read in one too.
+    host, _, port = address.partition(":")
+    client = redis.Redis(host=host, port=int(port or 6379), decode_responses=True)
+    with client.pipeline(transaction=True) as pipe:
+        pipe.lrange("history", 0, -1)
+        pipe.hget("round", "round_id")
+        pipe.get("betting_open")
+        history, round_id, betting_open = pipe.execute()
+    if not history or round_id is None:
+        return 0
+    latest = int(round_id) - (betting_open == "1")
+    ids = np.arange(latest, latest - len(history), -1, dtype="i8")[::-1]
+    points = np.array(history[::-1], "f8")
+    new = ids > store.watermark("history")
+    if not new.any():
+        return 0
+    store.append("history", {"round_id": ids[new], "crash_point": points[new]}, int(ids[-1]))
+    return int(new.sum())
+
+
+# --- Reports ---
+def dollars(cents):
+    return cents / 100
+
+
+def rtp_by_day(store):
+    # Bets take their day from their round's timestamp; ones whose round
+    # isn't exported yet (or is unknown) are left out
+    rounds, bets = store.columns("rounds"), store.columns("bets")
+    idx = np.searchsorted(rounds["id"], bets["round_id"])
+    idx[idx == len(rounds["id"])] = 0
+    found = (rounds["id"][idx] == bets["round_id"]) if len(rounds["id"]) else np.zeros(len(idx), bool)
+    days, inverse = np.unique(rounds["timestamp"][idx[found]] // DAY, return_inverse=True)
+    staked = dollars(np.bincount(inverse, bets["stake"][found], len(days)))
+    paid = dollars(np.bincount(inverse, bets["payout"][found], len(days)))
+    round_days, round_counts = np.unique(rounds["timestamp"] // DAY, return_counts=True)
+    per_day = dict(zip(round_days.tolist(), round_counts.tolist()))
+    return [{"day": str(np.datetime64(int(d), "D")), "rounds": per_day.get(d, 0),
+             "bets": int(n), "staked": s, "paid": p, "rtp": p / s if s else None}
+            for d, n, s, p in zip(days.tolist(), np.bincount(inverse, minlength=len(days)).tolist(),
+                                  staked.tolist(), paid.tolist())]
+
+
+def multiplier_distribution(store, edges=(1, 1.5, 2, 3, 5, 10, 20, 50, 100)):
+    multipliers = store.columns("bets")["multiplier"]
+    multipliers = multipliers[~np.isnan(multipliers)]
+    bins = np.concatenate([edges, [np.inf]])
+    counts, _ = np.histogram(multipliers, bins)
+    q = np.round(np.percentile(multipliers, [50, 90, 99]), 2).tolist() if len(multipliers) else [None]*3
+    return {"bins": [f"{lo:g}-{hi:g}" for lo, hi in zip(bins[:-1], bins[1:])], "counts": counts.tolist(),
+            "p50": q[0], "p90": q[1], "p99": q[2]}
+
+
+def user_pnl(store, top=None):
+    # Player-side P&L per user, biggest winners first
+    bets = store.columns("bets")
+    users, inverse = np.unique(bets["user_id"], return_inverse=True)
+    staked = dollars(np.bincount(inverse, bets["stake"], len(users)))
+    paid = dollars(np.bincount(inverse, bets["payout"], len(users)))
+    order = np.argsort(staked - paid)[:top]
+    return [{"user_id": int(u), "staked": s, "paid": p, "pnl": p - s}
+            for u, s, p in zip(users[order].tolist(), staked[order].tolist(), paid[order].tolist())]
+
+
+def report(store, top=20):
+    history = store.columns("history")["crash_point"]
+    return {"rtp_by_day": rtp_by_day(store),
+            "multipliers": multiplier_distribution(store),
+            "user_pnl": user_pnl(store, top),
+            "redis_history": {"rounds": len(history),
+                              "mean_crash": float(history.mean()) if len(history) else None}}
+
+
+def print_report(r):
+    print(f"{'day':>10} {'rounds':>8} {'bets':>9} {'staked':>12} {'paid':>12} {'rtp':>7}")
+    for d in r["rtp_by_day"]:
+        rtp = f"{d['rtp']:7.4f}" if d["rtp"] is not None else f"{'-':>7}"
+        print(f"{d['day']:>10} {d['rounds']:8} {d['bets']:9} {d['staked']:12.2f} {d['paid']:12.2f} {rtp}")
+    m = r["multipliers"]
+    print(f"\ncashout multipliers  p50 {m['p50']}  p90 {m['p90']}  p99 {m['p99']}")
+    for label, count in zip(m["bins"], m["counts"]):
+        print(f"{label:>10} {count:9}")
+    print(f"\n{'user':>8} {'staked':>12} {'paid':>12} {'pnl':>12}")
+    for u in r["user_pnl"]:
+        print(f"{u['user_id']:8} {u['staked']:12.2f} {u['paid']:12.2f} {u['pnl']:12.2f}")
+    h = r["redis_history"]
+    print(f"\nredis history: {h['rounds']} rounds, mean crash {h['mean_crash']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar export and reports for rounds and bets")
+    sub = parser.add_subparsers(dest="command", required=True)
+    e = sub.add_parser("export")
+    e.add_argument("--db", default="aviator.db")
+    e.add_argument("--redis", help="host:port of aviator_web's Redis")
+    e.add_argument("--out", default="analytics")
+    e.add_argument("--every", type=float, help="keep exporting every N seconds")
+    r = sub.add_parser("report")
+    r.add_argument("--out", default="analytics")
+    r.add_argument("--top", type=int, default=20, help="users listed in the P&L table")
+    r.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    if args.command == "report":
+        result = report(Store(args.out), args.top)
+        if args.json:
+            print(json.dumps(result, indent=2))
+        else:
+            print_report(result)
+        return
+    if args.redis and redis is None:
+        parser.error("--redis needs the redis package")
+    store = Store(args.out)
+    while True:
+        try:
+            counts = export_sqlite(store, args.db) if os.path.exists(args.db) else {}
+        except RuntimeError as e:
+            parser.error(str(e))
+        if args.redis:
+            counts["history"] = export_redis(store, args.redis)
+        print(", ".join(f"{table} +{n}" for table, n in counts.items()) or "nothing to export")
+        if args.every is None:
+            break
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
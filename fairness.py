@@ -0,0 +1,201 @@
+"""Provably-fair round seeds from a precomputed reverse SHA-256 hash chain.
+
+A chain is generated offline from a secret seed s:
+
+    h[n-1] = sha256(s),  h[i-1] = sha256(h[i])
+
+and stored as n raw 32-byte hashes in the order they are used (h[0]
+first).  Before play starts the operator publishes the commitment
+sha256(h[0]).  Round k is driven by h[k], revealed once the round is over.
+Anyone can then check sha256(h[k]) == h[k-1] (sha256(h[0]) == commitment),
+so no round's outcome can have been chosen after the fact, and recompute
+the round from the hash.
+
+    python fairness.py generate aviator.chain --rounds 3200000
+    python fairness.py verify revealed.chain --commitment <hex> --model app
+
+The servers memory-map their chain and pull one hash per round in O(1); the
+read position is persisted next to the chain file (<chain>.cursor, written
+at 0 by generate) so a restart never reuses a hash.  A server refuses to
+start from a chain whose cursor is missing or unreadable rather than begin
+again at hash 0, whose rounds have already been revealed.  A chain is opened on first use, not at import, and is generated
+then if the file doesn't exist yet.  Chain files live in $AVIATOR_CHAIN_DIR
+(default: the working directory); generate one there ahead of time to
+choose its length and seed.
+"""
+import argparse
+import hashlib
+import mmap
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+HASH_SIZE = 32
+DEFAULT_ROUNDS = 100_000  # chain generated on first use if none exists
+CHAIN_DIR = os.environ.get("AVIATOR_CHAIN_DIR", ".")
+
+
+def generate(path, rounds, seed=None):
+    seed = seed if seed is not None else os.urandom(HASH_SIZE)
+    sha256 = hashlib.sha256
+    buf = bytearray(rounds*HASH_SIZE)
+    h = sha256(seed).digest()
+    for offset in range((rounds - 1)*HASH_SIZE, -1, -HASH_SIZE):
+        buf[offset:offset + HASH_SIZE] = h
+        h = sha256(h).digest()
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(buf)
+    os.replace(tmp, path)
+    # After the chain: a crash in between leaves the new chain with an old
+    # cursor (skips hashes) or none (refused), never an old chain at 0
+    write_cursor(path + ".cursor", 0)
+    return commitment_of(bytes(buf[:HASH_SIZE]))
+
+
+def write_cursor(path, pos):
+    # fsynced before the rename, so a crash leaves the old cursor or the new
+    # one, never a truncated file
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(str(pos))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def commitment_of(first_hash):
+    return hashlib.sha256(first_hash).hexdigest()
+
+
+def uniform(h):
+    # Top 53 bits of the hash as a float in [0, 1)
+    return (int.from_bytes(h[:8], "big") >> 11) / (1 << 53)
+
+
+class HashChain:
+    def __init__(self, name, rounds=DEFAULT_ROUNDS):
+        # name is relative to CHAIN_DIR (an absolute path is used as is)
+        self.path = os.path.join(CHAIN_DIR, name)
+        self.cursor_path = self.path + ".cursor"
+        self.default_rounds = rounds
+        self.map = None
+
+    def open(self):
+        if self.map is not None:
+            return
+        if not os.path.exists(self.path):
+            generate(self.path, self.default_rounds)
+        with open(self.path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.rounds = len(self.map)//HASH_SIZE
+        self._commitment = commitment_of(self[0])
+        try:
+            with open(self.cursor_path) as f:
+                self.pos = int(f.read())
+        except (FileNotFoundError, ValueError) as e:
+            raise RuntimeError(f"hash chain {self.path} has no readable cursor ({e}); write the next "
+                               f"unrevealed index to {self.cursor_path}, or generate a new chain") from None
+
+    @property
+    def commitment(self):
+        self.open()
+        return self._commitment
+
+    def __len__(self):
+        self.open()
+        return self.rounds
+
+    def __getitem__(self, index):
+        offset = index*HASH_SIZE
+        return self.map[offset:offset + HASH_SIZE]
+
+    def next(self):
+        # Returns (index, hash) for the next round
+        self.open()
+        if self.pos >= self.rounds:
+            raise RuntimeError(f"hash chain {self.path} exhausted; generate a new one")
+        index = self.pos
+        self.pos += 1
+        write_cursor(self.cursor_path, self.pos)
+        return index, self[index]
+
+
+# --- Batch verification ---
+def _check_links(args):
+    path, start, stop = args
+    sha256 = hashlib.sha256
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        prev = m[(start - 1)*HASH_SIZE:start*HASH_SIZE]
+        for i in range(start, stop):
+            h = m[i*HASH_SIZE:(i + 1)*HASH_SIZE]
+            if sha256(h).digest() != prev:
+                return i
+            prev = h
+    return -1
+
+
+def verify_links(path, commitment, workers=None, chunk=250_000):
+    # Index of the first hash that does not link back to its predecessor
+    # (or to the commitment), or -1 if the whole file is a valid chain
+    size = os.path.getsize(path)//HASH_SIZE
+    with open(path, "rb") as f:
+        if commitment_of(f.read(HASH_SIZE)) != commitment:
+            return 0
+    jobs = [(path, start, min(start + chunk, size)) for start in range(1, size, chunk)]
+    with ProcessPoolExecutor(workers) as pool:
+        for bad in pool.map(_check_links, jobs):
+            if bad >= 0:
+                return bad
+    return -1
+
+
+def uniforms(path):
+    # Vectorized uniform() over every hash in a chain file
+    import numpy as np
+    hashes = np.memmap(path, dtype=np.uint8, mode="r").reshape(-1, HASH_SIZE)
+    top = hashes[:, :8].copy().view(">u8").ravel().astype(np.uint64)
+    return (top >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+def main():
+    import crash_models
+
+    parser = argparse.ArgumentParser(description="Provably-fair hash chains")
+    sub = parser.add_subparsers(dest="command", required=True)
+    gen = sub.add_parser("generate", help="write a new chain")
+    gen.add_argument("path")
+    gen.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS)
+    gen.add_argument("--seed", help="hex seed (random if omitted)")
+    ver = sub.add_parser("verify", help="check revealed hashes and recompute crash points")
+    ver.add_argument("path")
+    ver.add_argument("--commitment", required=True)
+    ver.add_argument("--model", choices=sorted(crash_models.VECTOR_MODELS), default="app")
+    ver.add_argument("--expect", help="file with one published crash point per line")
+    ver.add_argument("--workers", type=int)
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        seed = bytes.fromhex(args.seed) if args.seed else None
+        print(generate(args.path, args.rounds, seed))
+        return
+
+    bad = verify_links(args.path, args.commitment, args.workers)
+    if bad >= 0:
+        print(f"chain broken at round {bad}")
+        sys.exit(1)
+    crashes = crash_models.VECTOR_MODELS[args.model](uniforms(args.path))
+    print(f"{len(crashes)} rounds link to {args.commitment}")
+    if args.expect:
+        import numpy as np
+        expected = np.loadtxt(args.expect, ndmin=1)
+        n = min(len(expected), len(crashes))
+        mismatched = np.flatnonzero(np.abs(np.round(crashes[:n], 2) - np.round(expected[:n], 2)) > 0.005)
+        if len(mismatched):
+            print(f"{len(mismatched)} crash points differ, first at round {mismatched[0]}")
+            sys.exit(1)
+        print(f"{n} crash points match")
+
+
+if __name__ == "__main__":
+    main()
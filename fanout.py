@@ -0,0 +1,125 @@
+import asyncio
+import json
+from collections import deque
+
+# ----------------------
+# Broadcast fan-out
+# ----------------------
+# Each message is serialized once and handed to every connection's bounded
+# outbound queue; one writer task per socket drains it.  publish() never
+# awaits, so the game loop is never held up by a slow client.
+#
+# Frames published with droppable=True (multiplier ticks) are coalesced:
+# if the newest queued frame is also droppable it is replaced, so a slow
+# consumer only ever sees the latest multiplier.  A client whose queue is
+# still full of non-droppable frames is disconnected.
+#
+# Clients that negotiated the binary tick protocol (tickproto.py) get the
+# packed (frame, key) pair instead of the JSON text; whenever one of their
+# ticks is dropped or coalesced the next one is sent as a KEY frame.
+
+QUEUE_SIZE = 64
+
+
+class _Client:
+    __slots__ = ("ws", "queue", "last_droppable", "binary", "gap", "wakeup", "task")
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.queue = deque()
+        self.last_droppable = False
+        self.binary = False
+        self.gap = False
+        self.wakeup = asyncio.Event()
+        self.task = None
+
+
+class Fanout:
+    def __init__(self, queue_size=QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.clients = {}  # ws -> _Client
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.clients)
+
+    def add(self, ws):
+        client = _Client(ws)
+        client.task = asyncio.create_task(self._writer(client))
+        self.clients[ws] = client
+
+    def remove(self, ws):
+        client = self.clients.pop(ws, None)
+        if client is not None and client.task is not asyncio.current_task():
+            client.task.cancel()
+
+    def set_binary(self, ws):
+        client = self.clients.get(ws)
+        if client is not None:
+            client.binary = True
+
+    def publish(self, message, droppable=False, binary=None):
+        data = message if isinstance(message, (str, bytes)) else json.dumps(message)
+        for client in list(self.clients.values()):
+            if binary is not None and client.binary:
+                frame, key = binary
+                self._offer(client, key if client.gap else frame, droppable, key)
+            else:
+                self._offer(client, data, droppable)
+
+    def send(self, ws, message):
+        client = self.clients.get(ws)
+        if client is None:
+            return
+        data = message if isinstance(message, (str, bytes)) else json.dumps(message)
+        self._offer(client, data, False)
+
+    def _offer(self, client, data, droppable, key=None):
+        queue = client.queue
+        if droppable and client.last_droppable and queue:
+            queue[-1] = data if key is None else key
+            self.dropped += 1
+            return
+        if len(queue) >= self.queue_size:
+            if droppable:
+                self.dropped += 1
+                client.gap = key is not None
+                return
+            self._kick(client)
+            return
+        queue.append(data)
+        client.last_droppable = droppable
+        if key is not None:
+            client.gap = False
+        client.wakeup.set()
+
+    def _kick(self, client):
+        self.remove(client.ws)
+        asyncio.create_task(self._close(client.ws))
+
+    async def _close(self, ws):
+        try:
+            await ws.close(code=1013)
+        except Exception:
+            pass
+
+    async def _writer(self, client):
+        ws = client.ws
+        queue = client.queue
+        try:
+            while True:
+                if not queue:
+                    client.wakeup.clear()
+                    await client.wakeup.wait()
+                    continue
+                data = queue.popleft()
+                if not queue:
+                    client.last_droppable = False
+                if isinstance(data, bytes):
+                    await ws.send_bytes(data)
+                else:
+                    await ws.send_text(data)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.remove(ws)
@@ -0,0 +1,97 @@
+import bisect
+from array import array
+
+# --- Round history ---
+# Fixed-capacity ring of crash multipliers backed by array('d').  Pushing a
+# round is O(1) and keeps the aggregates (sum, bucket counts, rounds below
+# 2x, current streak below 2x) up to date incrementally.  The list and
+# stats payloads the servers send are built at most once per round and
+# cached until the next push.
+
+# Upper edges of the percentile buckets; the last bucket is open-ended
+BUCKETS = (1.2, 1.5, 2, 3, 5, 10, 20, 50, 100, 1000)
+LOW = 2.0  # "below 2x" threshold for the streak/count aggregates
+
+
+class RoundHistory:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.ring = array("d", bytes(8*capacity))
+        self.head = 0  # next slot to write
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0]*(len(BUCKETS) + 1)
+        self.below = 0
+        self.streak = 0  # consecutive latest rounds below LOW
+        self._cache = {}
+
+    def __len__(self):
+        return self.count
+
+    def push(self, value):
+        if self.count == self.capacity:
+            old = self.ring[self.head]
+            self.total -= old
+            self.buckets[bisect.bisect_left(BUCKETS, old)] -= 1
+            if old < LOW:
+                self.below -= 1
+        else:
+            self.count += 1
+        self.ring[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        self.total += value
+        self.buckets[bisect.bisect_left(BUCKETS, value)] += 1
+        if value < LOW:
+            self.below += 1
+            # A streak can't outlast the window
+            self.streak = min(self.streak + 1, self.count)
+        else:
+            self.streak = 0
+        self._cache.clear()
+
+    def extend(self, values):
+        for value in values:
+            self.push(value)
+
+    def values(self, newest_first=False):
+        start = (self.head - self.count) % self.capacity
+        out = [self.ring[(start + i) % self.capacity] for i in range(self.count)]
+        if newest_first:
+            out.reverse()
+        return out
+
+    def mean(self):
+        return self.total/self.count if self.count else 0.0
+
+    def percentile(self, p):
+        # Upper edge of the bucket holding the p-th percentile (None if open-ended)
+        if not self.count:
+            return None
+        rank = p/100*self.count
+        seen = 0
+        for edge, n in zip(BUCKETS, self.buckets):
+            seen += n
+            if seen >= rank:
+                return edge
+        return None
+
+    def stats(self):
+        cached = self._cache.get("stats")
+        if cached is None:
+            cached = self._cache["stats"] = {
+                "count": self.count,
+                "mean": round(self.mean(), 2),
+                "p50": self.percentile(50),
+                "p90": self.percentile(90),
+                "below_2x": self.below,
+                "streak_below_2x": self.streak,
+            }
+        return cached
+
+    def snapshot(self, newest_first=False, decimals=2):
+        # Rounded list ready to drop into a message; do not mutate it
+        key = ("list", newest_first, decimals)
+        cached = self._cache.get(key)
+        if cached is None:
+            cached = self._cache[key] = [round(v, decimals) for v in self.values(newest_first)]
+        return cached
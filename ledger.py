@@ -0,0 +1,115 @@
+import json
+import sqlite3
+import time
+from collections import deque
+
+# --- Write-behind ledger ---
+# Socket handlers never commit.  They queue balance deltas, bets and
+# rounds here, and a single background task calls flush() every
+# FLUSH_INTERVAL seconds, writing everything queued since the last flush in
+# one transaction with executemany.
+#
+# Durability contract: an event is acknowledged to the client as soon as it
+# is queued and becomes durable at the next flush, i.e. within
+# FLUSH_INTERVAL.  A process crash loses at most the last FLUSH_INTERVAL of
+# events.  The database runs in WAL mode with synchronous=NORMAL, so commits
+# do not fsync; an OS crash or power loss may additionally roll back the
+# most recent commits up to the last WAL checkpoint.
+#
+# Amounts are integer cents (see migrations.py).  A batch writes rounds
+# first, so the bets referencing them satisfy their foreign keys.  A row the
+# database refuses (IntegrityError, e.g. a bet for an unknown round) would
+# fail every retry and hold back everything queued with it, so the batch is
+# then rewritten row by row and refused rows go to ledger_rejects instead.
+
+FLUSH_INTERVAL = 0.2  # seconds
+
+# Kept as constants so sqlite3's statement cache reuses the prepared statements
+SQL_BALANCE = "UPDATE users SET balance=balance+? WHERE id=?"
+SQL_BET = "INSERT INTO bets(user_id,round_id,stake,multiplier,payout) VALUES (?,?,?,?,?)"
+SQL_ROUND = "INSERT INTO rounds(id,crash_point,timestamp) VALUES (?,?,?)"
+SQL_REJECT = "INSERT INTO ledger_rejects(tbl,row,error,timestamp) VALUES (?,?,?,?)"
+
+
+def connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False, cached_statements=64)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+class Ledger:
+    def __init__(self, path):
+        self.conn = connect(path)
+        self.balances = {}  # user_id -> delta not yet flushed
+        self.bets = deque()
+        self.rounds = deque()
+        self.rejected = 0  # rows moved to ledger_rejects
+
+    def add_balance(self, user_id, delta):
+        self.balances[user_id] = self.balances.get(user_id, 0) + delta
+
+    def add_bet(self, user_id, round_id, stake, multiplier, payout):
+        self.bets.append((user_id, round_id, stake, multiplier, payout))
+
+    def add_round(self, round_id, crash_point, timestamp):
+        self.rounds.append((round_id, crash_point, timestamp))
+
+    def pending_balance(self, user_id):
+        return self.balances.get(user_id, 0)
+
+    def has_pending(self):
+        return bool(self.balances or self.bets or self.rounds)
+
+    # flush() is take() + write(), split so an event loop can swap the queues
+    # out on its own thread and run only the blocking write() elsewhere
+    def take(self):
+        batch = (self.balances, self.bets, self.rounds)
+        self.balances, self.bets, self.rounds = {}, deque(), deque()
+        return batch
+
+    def write(self, batch):
+        balances, bets, rounds = batch
+        steps = (("rounds", SQL_ROUND, rounds), ("bets", SQL_BET, bets),
+                 ("users", SQL_BALANCE, [(d, uid) for uid, d in balances.items()]))
+        try:
+            with self.conn:
+                for _, sql, rows in steps:
+                    self.conn.executemany(sql, rows)
+        except sqlite3.IntegrityError:
+            self.write_rows(steps)
+
+    def write_rows(self, steps):
+        # A failed statement only undoes itself, so the good rows still
+        # commit together
+        with self.conn:
+            for table, sql, rows in steps:
+                for row in rows:
+                    try:
+                        self.conn.execute(sql, row)
+                    except sqlite3.IntegrityError as e:
+                        self.conn.execute(SQL_REJECT, (table, json.dumps(list(row)), str(e), time.time()))
+                        self.rejected += 1
+
+    def restore(self, batch):
+        # Put a failed batch back in front of anything queued meanwhile
+        balances, bets, rounds = batch
+        for uid, d in balances.items():
+            self.add_balance(uid, d)
+        self.bets.extendleft(reversed(bets))
+        self.rounds.extendleft(reversed(rounds))
+
+    def flush(self):
+        if not self.has_pending():
+            return
+        batch = self.take()
+        try:
+            self.write(batch)
+        except sqlite3.Error:
+            self.restore(batch)
+            raise
+
+    def close(self):
+        self.flush()
+        self.conn.close()
@@ -1,6 +1,16 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
-import asyncio, random
+import asyncio, random, json, math, time
+import metrics
+from fairness import HashChain
+from crash_models import walk_step
+from collections import deque
+import numpy as np
+from tickproto import TickEncoder
+from ticker import Ticker
+from resume import Sessions, ReplayBuffer, sweep
+from admission import Gate
 
 app = FastAPI()
 
@@ -12,100 +22,281 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-connected_clients = {}  # ws_id -> {"ws": WebSocket, "balance": float}
+connected_clients = {}  # sid -> {"ws": WebSocket, "balance": float, "binary": bool, "tier": str, "outbox": deque}
 current_round = None
-round_history = []
+round_number = 0
+round_history = deque(maxlen=1000)  # settled bets, newest last
+chain = HashChain("rounds.chain")  # provably-fair round seeds, see fairness.py
 
-HOUSE_EDGE = 0.02
 ROUND_DURATION = 12  # seconds
 TICK_INTERVAL = 0.5   # seconds
+SETTLE_CONCURRENCY = 256  # round results in flight at once
+SPECTATOR_EVERY = 2       # spectators get at most every 2nd tick...
+SPECTATOR_BUDGET = 1000   # ...and fewer once they'd exceed this many sends per tick
+
+# --- Subscription tiers ---
+# Bettors in the running round (current_round.bets) get every tick,
+# spectators a thinned stream and idle tabs only round start and end.  The
+# sets change on connect, bet, "watch", round end and disconnect, never per
+# tick; a bettor leaves its watch set for the round and returns at the end.
+spectators = set()  # sids
+idle = set()
+
+def watch_set(info):
+    return idle if info["tier"] == "idle" else spectators
+
+def betting(sid):
+    return current_round is not None and current_round.active and sid in current_round.bets
+
+# --- Sessions ---
+# Clients are keyed by a resume token (sid) rather than the socket, so a
+# client that reconnects with it keeps its balance and bet and is sent only
+# the round events it missed (see resume.py).  Results settled while it was
+# away wait in its outbox.
+sessions = Sessions()
+replay = ReplayBuffer()
+
+def record(message, tick=False):
+    # Stamps a broadcast event with its seq, keeps it for replay and returns it serialized
+    message["seq"] = replay.stamp()
+    text = json.dumps(message)
+    replay.add(message["seq"], text, tick)
+    return text
+
+def detach_client(sid):
+    info = connected_clients.pop(sid, None)
+    spectators.discard(sid)
+    idle.discard(sid)
+    if info is not None:
+        info["ws"] = None
+    sessions.detach(sid)
+
+TICK_DRIFT = metrics.Histogram("aviator_tick_drift_seconds", "Lateness of each round tick against its intended time")
+TICKS_SKIPPED = metrics.Counter("aviator_ticks_skipped", "Late round ticks merged into the next one")
+BROADCAST_SECONDS = metrics.Histogram("aviator_broadcast_seconds", "Time to emit one tick to all sockets")
+SETTLE_SECONDS = metrics.Histogram("aviator_settle_seconds", "Time to pay out and deliver a round's results")
+ROUNDS = metrics.Counter("aviator_rounds", "Rounds played")
+metrics.Gauge("aviator_connections", "Connected clients", lambda: len(connected_clients))
+metrics.Gauge("aviator_spectators", "Clients on the thinned tick stream", lambda: len(spectators))
+metrics.Gauge("aviator_idle", "Clients receiving round start and end only", lambda: len(idle))
 
 # --- Round Class ---
 class Round:
     def __init__(self):
+        global round_number
+        round_number += 1
+        self.round_id = round_number
         self.multiplier = 1.0
         self.active = True
-        self.bets = {}        # ws_id -> bet amount
-        self.cashouts = {}    # ws_id -> cashout multiplier
+        self.bets = {}        # sid -> bet amount
+        self.cashouts = {}    # sid -> cashout multiplier
+        self.encoder = TickEncoder()
+        self.encoder.start(self.round_id)
+        # The whole multiplier path replays from the round's chain hash
+        self.chain_index, self.hash = chain.next()
+        self.rng = random.Random(self.hash)
 
     async def run(self):
-        global round_history
         ticks = int(ROUND_DURATION / TICK_INTERVAL)
-        for _ in range(ticks):
-            if not self.active:
-                break
-            await asyncio.sleep(TICK_INTERVAL)
-            # RNG multiplier growth with house edge
-            growth = random.uniform(0.01, 0.15)
-            # Rare chance for high multiplier
-            if random.random() < 0.05: growth *= 3
-            self.multiplier *= (1 + growth)
-            self.multiplier -= self.multiplier * HOUSE_EDGE
-            await self.broadcast(update_only=True)
+        replay.start_round()
+        start = record({"type": "round_start", "round_id": self.round_id})
+        await self.deliver_all([(sid, start) for sid in list(connected_clients)])
+        ticker = Ticker(TICK_INTERVAL, time.monotonic() + TICK_INTERVAL)
+        steps = 0
+        while self.active and steps < ticks:
+            index = min(await ticker.asleep(), ticks - 1)
+            TICK_DRIFT.observe(ticker.lag)
+            TICKS_SKIPPED.inc(ticker.merged)
+            # RNG multiplier growth with house edge; merged ticks still take
+            # their steps so the path stays replayable from the round hash
+            while steps <= index:
+                self.multiplier = walk_step(self.multiplier, self.rng)
+                steps += 1
+            t0 = time.perf_counter()
+            await self.broadcast(index)
+            BROADCAST_SECONDS.observe(time.perf_counter() - t0)
         # End round
         self.active = False
-        # Settle bets
-        for ws_id, bet in self.bets.items():
-            cashout = self.cashouts.get(ws_id, self.multiplier)
-            win = bet * cashout
-            # Update client balance
-            if ws_id in connected_clients:
-                connected_clients[ws_id]["balance"] += win
+        ROUNDS.inc()
+        t0 = time.perf_counter()
+        await self.settle()
+        SETTLE_SECONDS.observe(time.perf_counter() - t0)
+        # Bettors got their own result from settle()
+        end = record({"type": "round_end", "round_id": self.round_id, "multiplier": round(self.multiplier,2),
+                      "hash": self.hash.hex(), "chain_index": self.chain_index})
+        await self.deliver_all([(sid, end) for sid in list(spectators) + list(idle)])
+        for sid in self.bets:
+            info = connected_clients.get(sid)
+            if info is not None:
+                watch_set(info).add(sid)
+
+    async def settle(self):
+        # Payouts for every bet in one vectorized pass, then results go out
+        # concurrently so settlement time doesn't add up per socket
+        n = len(self.bets)
+        if not n:
+            return
+        sids = list(self.bets)
+        bets = np.fromiter(self.bets.values(), float, n)
+        cashouts = np.fromiter((self.cashouts.get(sid, self.multiplier) for sid in sids), float, n)
+        wins = bets * cashouts
+        multiplier = round(self.multiplier,2)
+        results = []
+        for sid, bet, cashout, win, win_exact in zip(sids, bets.tolist(), np.round(cashouts,2).tolist(),
+                                                       np.round(wins,2).tolist(), wins.tolist()):
+            client = sessions.get(sid)
+            if client is not None:
+                client["balance"] += win_exact
             data = {
                 "type": "round_update",
-                "multiplier": round(self.multiplier,2),
+                "multiplier": multiplier,
                 "roundOver": True,
-                "balance": connected_clients[ws_id]["balance"] if ws_id in connected_clients else 0,
+                "balance": client["balance"] if client is not None else 0,
                 "bet": bet,
-                "cashout": round(cashout,2),
-                "win": round(win,2)
+                "cashout": cashout,
+                "win": win,
+                "hash": self.hash.hex(),
+                "chain_index": self.chain_index
             }
-            await self.send_to_client(ws_id, data)
-            round_history.append(data)
-
-    async def broadcast(self, update_only=False):
-        msg = {"type": "round_update", "multiplier": round(self.multiplier,2), "roundOver": False}
-        for ws_id, info in connected_clients.items():
-            if info["ws"].client_state.name != "CONNECTED": continue
-            if update_only and ws_id not in self.bets: continue
-            try:
-                await info["ws"].send_json(msg)
-            except:
-                connected_clients.pop(ws_id, None)
+            results.append((sid, data))
+        round_history.extend(data for _, data in results)
+        await self.deliver_all(results)
+
+    async def deliver_all(self, messages):
+        limit = asyncio.Semaphore(SETTLE_CONCURRENCY)
+        async def deliver(sid, data):
+            async with limit:
+                await self.send_to_client(sid, data)
+        await asyncio.gather(*(deliver(sid, data) for sid, data in messages))
 
-    async def send_to_client(self, ws_id, msg):
-        if ws_id in connected_clients:
+    async def broadcast(self, tick):
+        # Serialized once per tick in both wire formats (see tickproto.py)
+        msg = record({"type": "round_update", "multiplier": round(self.multiplier,2), "roundOver": False}, tick=True)
+        seq = self.encoder.seq
+        frame, key = self.encoder.encode(self.multiplier)
+        targets = list(self.bets)
+        # Spectator rate drops as their number grows, keeping their share of
+        # sends per tick near SPECTATOR_BUDGET
+        if tick % max(SPECTATOR_EVERY, math.ceil(len(spectators)/SPECTATOR_BUDGET)) == 0:
+            targets.extend(spectators)
+        for sid in targets:
+            info = connected_clients.get(sid)
+            if info is None: continue
             try:
-                await connected_clients[ws_id]["ws"].send_json(msg)
+                if info["binary"]:
+                    # Clients that missed the previous tick resync from a key frame
+                    prev = info.get("tick")
+                    info["tick"] = (self.round_id, seq)
+                    await info["ws"].send_bytes(frame if prev == (self.round_id, seq-1) else key)
+                else:
+                    await info["ws"].send_text(msg)
             except:
-                connected_clients.pop(ws_id, None)
+                detach_client(sid)
+
+    async def send_to_client(self, sid, msg):
+        info = connected_clients.get(sid)
+        if info is None:
+            # Held for a detached session until it resumes
+            state = sessions.get(sid)
+            if state is not None:
+                state["outbox"].append(msg)
+            return
+        try:
+            if isinstance(msg, str):
+                await info["ws"].send_text(msg)
+            else:
+                await info["ws"].send_json(msg)
+        except:
+            detach_client(sid)
+
+async def resume_client(ws, fresh_sid, sid, info, hello):
+    # Moves this socket off its fresh session onto the one it is resuming
+    sessions.close(fresh_sid)
+    connected_clients.pop(fresh_sid, None)
+    spectators.discard(fresh_sid)
+    idle.discard(fresh_sid)
+    old, info["ws"] = info["ws"], ws
+    info["binary"] = hello.get("proto") == "bin"
+    info.pop("tick", None)
+    connected_clients[sid] = info
+    if old is not None:
+        # The old socket hasn't noticed it's gone yet; this one takes over
+        try:
+            await old.close()
+        except Exception:
+            pass
+    if not betting(sid):
+        watch_set(info).add(sid)
+    missed = replay.since(hello.get("seq", -1))
+    await ws.send_json({"type": "session", "token": sid, "balance": info["balance"], "resumed": missed is not None,
+                        "commitment": chain.commitment})
+    for text in missed or ():
+        await ws.send_text(text)
+    while info["outbox"]:
+        await ws.send_json(info["outbox"].popleft())
+
+@app.on_event("startup")
+async def startup_event():
+    asyncio.create_task(sweep(sessions))
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 @app.websocket("/ws")
 async def websocket_endpoint(ws: WebSocket):
+    global current_round
     await ws.accept()
-    ws_id = id(ws)
-    connected_clients[ws_id] = {"ws": ws, "balance": 1000.0}
+    info = {"ws": ws, "balance": 1000.0, "binary": False, "tier": "spectator", "outbox": deque(maxlen=8)}
+    sid = sessions.open(info)
+    connected_clients[sid] = info
+    spectators.add(sid)
+    gate = Gate()  # see admission.py; replay.seq moves on every tick
     try:
         while True:
             data = await ws.receive_json()
-            if data["type"] == "place_bet":
-                global current_round
+            if not gate.admit(data["type"], replay.seq if data["type"] in ("place_bet", "cash_out") else None, data.get("bet")):
+                continue
+            if data["type"] == "hello":
+                # {"resume": token, "seq": last seen} reattaches an earlier session
+                resumed = sessions.resume(data["resume"]) if data.get("resume") else None
+                if resumed is not None and resumed is not info:
+                    fresh_sid, sid, info = sid, data["resume"], resumed
+                    await resume_client(ws, fresh_sid, sid, info, data)
+                    continue
+                info["binary"] = data.get("proto") == "bin"
+                # Players check each round_end hash against the commitment
+                await ws.send_json({"type": "session", "token": sid, "balance": info["balance"],
+                                    "commitment": chain.commitment})
+            elif data["type"] == "watch":
+                # "spectator", or "idle" for a hidden tab
+                bettor = betting(sid)
+                if not bettor:
+                    watch_set(info).discard(sid)
+                info["tier"] = "idle" if data.get("mode") == "idle" else "spectator"
+                if not bettor:
+                    watch_set(info).add(sid)
+            elif data["type"] == "place_bet":
                 if current_round is None or not current_round.active:
                     current_round = Round()
                     asyncio.create_task(current_round.run())
-                if ws_id in current_round.bets:
+                if sid in current_round.bets:
                     # prevent double betting in same round
                     await ws.send_json({"type":"error","message":"Already bet this round"})
                     continue
                 bet = data["bet"]
                 # check balance
-                if bet <= 0 or bet > connected_clients[ws_id]["balance"]:
+                if bet <= 0 or bet > info["balance"]:
                     await ws.send_json({"type":"error","message":"Invalid bet"})
                     continue
-                connected_clients[ws_id]["balance"] -= bet
-                current_round.bets[ws_id] = bet
+                info["balance"] -= bet
+                current_round.bets[sid] = bet
+                watch_set(info).discard(sid)
             elif data["type"] == "cash_out":
-                if current_round and ws_id in current_round.bets and ws_id not in current_round.cashouts:
-                    current_round.cashouts[ws_id] = current_round.multiplier
+                if current_round and sid in current_round.bets and sid not in current_round.cashouts:
+                    current_round.cashouts[sid] = current_round.multiplier
     except WebSocketDisconnect:
-        connected_clients.pop(ws_id, None)
+        pass
+    finally:
+        if info["ws"] is ws:
+            detach_client(sid)
@@ -0,0 +1,91 @@
+import bisect
+from array import array
+
+# --- Metrics ---
+# Counters, gauges and log-linear (HDR-style) histograms for the game
+# loops, exposed in the Prometheus text format.  Recording is a plain
+# attribute or preallocated-array update on the caller's thread: no locks,
+# no per-sample objects beyond the float being recorded.  Each process has
+# its own registry; with several workers every worker must be scraped.
+
+# Histogram bucket upper bounds in seconds: 4 linear steps per power of two
+# from 16us to ~67s
+BOUNDS = tuple(2.0**e * (1 + s/4) for e in range(-16, 6) for s in range(4))
+
+registry = []
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help):
+        # The sample, HELP and TYPE all use the *_total name, as text-format
+        # parsers expect
+        self.name = name if name.endswith("_total") else name + "_total"
+        self.help = help
+        self.value = 0
+        registry.append(self)
+
+    def inc(self, n=1):
+        self.value += n
+
+    def render(self):
+        return [f"{self.name} {self.value}"]
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name, help, fn=None):
+        # fn, if given, is read at scrape time so nothing runs on the hot path
+        self.name = name
+        self.help = help
+        self.value = 0
+        self.fn = fn
+        registry.append(self)
+
+    def set(self, value):
+        self.value = value
+
+    def render(self):
+        return [f"{self.name} {self.fn() if self.fn else self.value}"]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, bounds=BOUNDS):
+        self.name = name
+        self.help = help
+        self.bounds = bounds
+        self.counts = array("Q", bytes(8*(len(bounds) + 1)))
+        self.sum = 0.0
+        registry.append(self)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def render(self):
+        lines = []
+        seen = 0
+        for bound, n in zip(self.bounds, self.counts):
+            seen += n
+            lines.append(f'{self.name}_bucket{{le="{bound:.6g}"}} {seen}')
+        seen += self.counts[-1]
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {seen}')
+        lines.append(f"{self.name}_sum {self.sum}")
+        lines.append(f"{self.name}_count {seen}")
+        return lines
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def render():
+    lines = []
+    for metric in registry:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,114 @@
+import sqlite3
+
+# --- Schema migrations ---
+# The schema version lives in SQLite's PRAGMA user_version.  migrate() runs
+# every step above the database's version in order, each in its own
+# transaction together with the version bump, so an interrupted upgrade
+# resumes from the last step that committed.  A database from before
+# migrations existed is version 0 and starts at the baseline, whose CREATE
+# TABLE IF NOT EXISTS statements leave its tables as they are.
+#
+# Money is INTEGER minor units (cents) from version 2 on: balances, stakes
+# and payouts add up exactly, with no float drift.
+
+BASELINE = [
+    """CREATE TABLE IF NOT EXISTS users(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE,
+        password TEXT,
+        balance REAL)""",
+    """CREATE TABLE IF NOT EXISTS rounds(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        crash_point REAL,
+        timestamp REAL)""",
+    """CREATE TABLE IF NOT EXISTS cashouts(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        round_id INTEGER,
+        multiplier REAL,
+        amount REAL)""",
+]
+
+# users.balance to cents, cashouts replaced by bets.  Rows copied from
+# cashouts keep their ids; a round_id with no rounds row (the round counter
+# used to restart with the process) becomes NULL, and cashouts of users
+# that don't exist are dropped.  The stake is worked back from amount and
+# multiplier; the multiplier came from the client, so one that is 0,
+# negative or NULL gives a stake of 0 rather than a NULL.
+CENTS = [
+    """CREATE TABLE users_new(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        balance INTEGER NOT NULL DEFAULT 0)""",
+    """INSERT INTO users_new(id,username,password,balance)
+        SELECT id,username,password,CAST(ROUND(IFNULL(balance,0)*100) AS INTEGER) FROM users""",
+    "DROP TABLE users",
+    "ALTER TABLE users_new RENAME TO users",
+    """CREATE TABLE bets(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL REFERENCES users(id),
+        round_id INTEGER REFERENCES rounds(id),
+        stake INTEGER NOT NULL,
+        multiplier REAL,
+        payout INTEGER NOT NULL DEFAULT 0)""",
+    """INSERT INTO bets(id,user_id,round_id,stake,multiplier,payout)
+        SELECT c.id, c.user_id, r.id,
+               CASE WHEN c.multiplier > 0 THEN IFNULL(CAST(ROUND(c.amount/c.multiplier*100) AS INTEGER), 0) ELSE 0 END,
+               c.multiplier, IFNULL(CAST(ROUND(c.amount*100) AS INTEGER), 0)
+        FROM cashouts c JOIN users u ON u.id=c.user_id LEFT JOIN rounds r ON r.id=c.round_id""",
+    "DROP TABLE cashouts",
+]
+
+# Covering indexes for the queries that grow with the tables:
+#   per-user history   WHERE user_id=? ORDER BY id DESC
+#   round settlement   WHERE round_id=?
+#   reports by date    WHERE timestamp BETWEEN ? AND ?
+INDEXES = [
+    "CREATE INDEX bets_user ON bets(user_id, id, round_id, stake, multiplier, payout)",
+    "CREATE INDEX bets_round ON bets(round_id, user_id, stake, multiplier, payout)",
+    "CREATE INDEX rounds_timestamp ON rounds(timestamp, crash_point)",
+]
+
+# Ledger rows the database refused (e.g. a bet whose round or user is
+# gone), kept as JSON so they can be looked at and replayed by hand
+REJECTS = [
+    """CREATE TABLE ledger_rejects(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tbl TEXT NOT NULL,
+        row TEXT NOT NULL,
+        error TEXT NOT NULL,
+        timestamp REAL NOT NULL)""",
+]
+
+MIGRATIONS = [BASELINE, CENTS, INDEXES, REJECTS]  # version n is MIGRATIONS[n-1]
+
+
+def version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    # Brings the database up to len(MIGRATIONS); returns the steps applied
+    current = version(conn)
+    if current > len(MIGRATIONS):
+        raise RuntimeError(f"database schema v{current} is newer than this code (v{len(MIGRATIONS)})")
+    # Tables are rebuilt with foreign keys off (it can't change inside a
+    # transaction) and checked before each step commits
+    conn.execute("PRAGMA foreign_keys=OFF")
+    applied = 0
+    for target in range(current + 1, len(MIGRATIONS) + 1):
+        try:
+            conn.execute("BEGIN")
+            for statement in MIGRATIONS[target - 1]:
+                conn.execute(statement)
+            if conn.execute("PRAGMA foreign_key_check").fetchone() is not None:
+                raise sqlite3.IntegrityError(f"migration to v{target} breaks a foreign key")
+            conn.execute(f"PRAGMA user_version={target}")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        applied += 1
+    conn.execute("PRAGMA foreign_keys=ON")
+    return applied
@@ -0,0 +1,112 @@
+import asyncio
+import secrets
+import time
+from collections import deque
+
+# --- Session resume ---
+# A network blip used to cost a full re-init: new player state, a balance
+# read and the whole history again, for every client at once.  Instead each
+# connection gets a resume token for a session that outlives the socket by
+# SESSION_TTL seconds, and servers keep a small replay buffer of the
+# current round's sequenced events.  A client that reconnects with its
+# token and the last seq it saw is reattached to its session and sent only
+# what it missed; a stale token or a gap the buffer no longer covers falls
+# back to the usual full init.
+
+SESSION_TTL = 60   # seconds a detached session can be resumed
+REPLAY_SIZE = 64   # non-tick events kept per round
+SWEEP_INTERVAL = 5  # seconds between expiry sweeps
+
+
+class Sessions:
+    def __init__(self, ttl=SESSION_TTL):
+        self.ttl = ttl
+        self.states = {}    # token -> caller's session state
+        self.detached = {}  # token -> expiry deadline
+
+    def open(self, state):
+        token = secrets.token_urlsafe(16)
+        self.states[token] = state
+        return token
+
+    def get(self, token):
+        return self.states.get(token)
+
+    def resume(self, token):
+        # The session's state if it can be reattached, else None
+        state = self.states.get(token)
+        if state is not None:
+            self.detached.pop(token, None)
+        return state
+
+    def detach(self, token):
+        if token in self.states:
+            self.detached[token] = time.monotonic() + self.ttl
+
+    def close(self, token):
+        self.detached.pop(token, None)
+        return self.states.pop(token, None)
+
+    def expire(self):
+        # Drops sessions detached for longer than ttl; returns their states
+        now = time.monotonic()
+        expired = []
+        for token, deadline in list(self.detached.items()):
+            if deadline <= now:
+                del self.detached[token]
+                expired.append(self.states.pop(token))
+        return expired
+
+    def __len__(self):
+        return len(self.states)
+
+
+async def sweep(sessions, interval=SWEEP_INTERVAL):
+    # Background task for servers without a periodic loop of their own, so
+    # expired sessions go even while no one connects
+    while True:
+        await asyncio.sleep(interval)
+        sessions.expire()
+
+
+class ReplayBuffer:
+    # Events carry increasing sequence numbers.  Only the latest tick is
+    # kept (a client that missed ten ticks only needs the newest one), and
+    # the buffer is cleared at each round start, so a client whose last seq
+    # is from an earlier round gets a full resync instead.
+    def __init__(self, size=REPLAY_SIZE):
+        self.events = deque(maxlen=size)  # (seq, event)
+        self.tick = None   # (seq, event) of the latest tick
+        self.seq = 0       # last seq added
+        self.floor = 0     # events after this seq are all still here
+
+    def stamp(self):
+        # Sequence number for the next locally produced event
+        return self.seq + 1
+
+    def start_round(self):
+        self.events.clear()
+        self.tick = None
+        self.floor = self.seq
+
+    def add(self, seq, event, tick=False):
+        # Events may arrive slightly out of order (ticks and events can come
+        # over separate channels); since() sorts by seq
+        if tick:
+            if self.tick is None or seq > self.tick[0]:
+                self.tick = (seq, event)
+        else:
+            if len(self.events) == self.events.maxlen:
+                self.floor = self.events[0][0]
+            self.events.append((seq, event))
+        self.seq = max(self.seq, seq)
+
+    def since(self, seq):
+        # Events after seq in order, or None when they can't be replayed
+        if seq < self.floor or seq > self.seq:
+            return None
+        missed = [item for item in self.events if item[0] > seq]
+        if self.tick is not None and self.tick[0] > seq:
+            missed.append(self.tick)
+        missed.sort(key=lambda item: item[0])
+        return [event for _, event in missed]
@@ -0,0 +1,169 @@
+"""Monte Carlo RTP / house-edge simulator for the servers' crash models.
+
+Simulates rounds in batched numpy arrays across a process pool, using the
+outcome rules from crash_models.py, and reports for every cash-out
+strategy:
+
+    rtp        total paid out / total staked
+    variance   variance of the return per unit stake
+    p_win      share of rounds the player's bet returns anything
+    house      house P&L per block of --block unit-stake rounds: mean, 1st
+               percentile (the house's 99% VaR) and P(block < 0)
+
+    python simulate.py --rounds 20000000 --model app --targets 1.5 2 5 10
+
+Models (see crash_models.py):
+    app      app.py: crash point 1 + (30u)^1.5 * 0.85, curve ticks of curve.py;
+             the stake is lost if the round crashes before the target
+    session  app_module.py: crash point uniform in [1, 1e6], steps of 0.05-100x;
+             the stake is lost if the round crashes before the target
+    walk     main.py: 24-tick multiplicative walk; bets not cashed out settle
+             at the final multiplier (target 'hold' never cashes out)
+"""
+import argparse
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import crash_models
+import curve
+
+BATCH = 1_000_000
+WALK_TICKS = 24  # ROUND_DURATION / TICK_INTERVAL in main.py
+
+
+# --- Per-model payouts ---
+# Each returns the payout per unit stake for n rounds under every target,
+# shape (len(targets), n)
+
+def payouts_app(rng, n, targets):
+    crash = crash_models.app_crash(rng.random(n))
+    out = np.empty((len(targets), n))
+    for i, target in enumerate(targets):
+        # Cash-out lands on the first curve tick at or above the target,
+        # valid only if that tick comes before the crash tick
+        cashout = curve.multiplier_at_tick(curve.crash_tick(target))
+        out[i] = np.where(cashout < crash, cashout, 0.0)
+    return out
+
+
+def payouts_session(rng, n, targets):
+    crash = crash_models.session_crash_array(rng.random(n))
+    out = np.empty((len(targets), n))
+    for i, target in enumerate(targets):
+        # Walk every round's path until it reaches the target or crashes
+        multiplier = np.ones(n)
+        live = np.ones(n, dtype=bool)
+        while live.any():
+            idx = np.flatnonzero(live)
+            multiplier[idx] = np.round(multiplier[idx] + crash_models.session_step_array(rng, len(idx)), 2)
+            live[idx] = (multiplier[idx] < target) & (multiplier[idx] < crash[idx])
+        out[i] = np.where(multiplier < crash, multiplier, 0.0)
+    return out
+
+
+def payouts_walk(rng, n, targets):
+    # Only the running multiplier is kept: each target records the first
+    # value that reaches it (nan until then), so memory stays at
+    # (targets, n) rather than a (WALK_TICKS, n) path
+    multiplier = np.ones(n)
+    out = np.full((len(targets), n), np.nan)
+    for _ in range(WALK_TICKS):
+        multiplier = crash_models.walk_step_array(multiplier, rng)
+        for i, target in enumerate(targets):
+            row = out[i]
+            hit = np.isnan(row) & (multiplier >= target)
+            row[hit] = multiplier[hit]
+    # Never reached: the bet settles at the final multiplier
+    np.copyto(out, multiplier, where=np.isnan(out))
+    return out
+
+
+MODELS = {"app": payouts_app, "session": payouts_session, "walk": payouts_walk}
+
+
+def run_batch(args):
+    model, n, targets, seed, block = args
+    rng = np.random.default_rng(seed)
+    payouts = MODELS[model](rng, n, targets)
+    blocks = n//block
+    house = (1.0 - payouts[:, :blocks*block]).reshape(len(targets), blocks, block).sum(axis=2)
+    return (payouts.sum(axis=1), (payouts**2).sum(axis=1), (payouts > 0).sum(axis=1), house)
+
+
+def simulate(model, rounds, targets, block=1000, seed=0, workers=None):
+    batches = []
+    remaining = rounds
+    index = 0
+    while remaining > 0:
+        n = min(BATCH, remaining)
+        batches.append((model, n, targets, [seed, index], block))
+        remaining -= n
+        index += 1
+
+    total = np.zeros(len(targets))
+    squares = np.zeros(len(targets))
+    wins = np.zeros(len(targets))
+    house = []
+    with ProcessPoolExecutor(workers) as pool:
+        for s, sq, w, h in pool.map(run_batch, batches):
+            total += s
+            squares += sq
+            wins += w
+            house.append(h)
+    house = np.concatenate(house, axis=1) if house else np.zeros((len(targets), 0))
+
+    results = []
+    for i, target in enumerate(targets):
+        mean = total[i]/rounds
+        blocks = house[i]
+        results.append({
+            "target": "hold" if math.isinf(target) else target,
+            "rtp": mean,
+            "house_edge": 1 - mean,
+            "variance": squares[i]/rounds - mean*mean,
+            "p_win": wins[i]/rounds,
+            "house_block_mean": float(blocks.mean()) if len(blocks) else None,
+            "house_block_p1": float(np.percentile(blocks, 1)) if len(blocks) else None,
+            "house_block_p_loss": float((blocks < 0).mean()) if len(blocks) else None,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo RTP simulator for the crash models")
+    parser.add_argument("--model", choices=sorted(MODELS), nargs="+", default=sorted(MODELS))
+    parser.add_argument("--rounds", type=int, default=10_000_000)
+    parser.add_argument("--targets", nargs="+", default=["1.1", "1.5", "2", "3", "5", "10", "100"],
+                        help="cash-out multipliers; 'hold' never cashes out")
+    parser.add_argument("--block", type=int, default=1000, help="rounds per house P&L block")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+    if args.rounds < args.block:
+        parser.error("--rounds must be at least --block")
+    targets = [math.inf if t == "hold" else float(t) for t in args.targets]
+
+    report = {}
+    for model in args.model:
+        model_targets = targets if model == "walk" else [t for t in targets if not math.isinf(t)]
+        report[model] = simulate(model, args.rounds, model_targets, args.block, args.seed, args.workers)
+
+    if args.json:
+        print(json.dumps({"rounds": args.rounds, "block": args.block, "models": report}, indent=2))
+        return
+    for model, results in report.items():
+        print(f"\n{model}  ({args.rounds:,} rounds, house P&L per {args.block} unit bets)")
+        print(f"{'target':>8} {'rtp':>8} {'edge':>8} {'variance':>12} {'p_win':>7} {'house':>10} {'VaR99':>10} {'P(loss)':>8}")
+        for r in results:
+            print(f"{str(r['target']):>8} {r['rtp']:8.4f} {r['house_edge']:8.4f} {r['variance']:12.4g} "
+                  f"{r['p_win']:7.4f} {r['house_block_mean']:10.2f} {r['house_block_p1']:10.2f} "
+                  f"{r['house_block_p_loss']:8.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import fakeredis
+import pytest
+
+# Root modules are shared by the servers; aviator_web's import each other
+# by bare name, as they do when it runs from its own directory
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "aviator_web")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+@pytest.fixture
+def redis_server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def aviator_web(monkeypatch, tmp_path, redis_server):
+    # aviator_web/server.py on a fake Redis, with short rounds
+    import assets
+    import redis.asyncio
+    monkeypatch.setattr(redis.asyncio, "Redis",
+                        lambda **kw: fakeredis.FakeAsyncRedis(server=redis_server, decode_responses=True))
+    # The deploy step's static build, kept out of the source tree
+    web = os.path.join(ROOT, "aviator_web")
+    assets.build([(os.path.join(web, "web"), ""), (os.path.join(web, "assets"), "assets")], str(tmp_path / "dist"))
+    monkeypatch.setenv("AVIATOR_STATIC_DIR", str(tmp_path / "dist"))
+    # A fresh module each time: its replay buffer and sessions are globals
+    monkeypatch.delitem(sys.modules, "server", raising=False)
+    import server as module
+    monkeypatch.setattr(module, "round_duration", 3)
+    monkeypatch.setattr(module, "round_interval", 0.5)
+    return module
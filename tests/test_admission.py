@@ -0,0 +1,51 @@
+import time
+
+from admission import Gate, TokenBucket, BURST, CONTROL_BURST
+
+
+def test_bucket_refills_at_rate():
+    bucket = TokenBucket(rate=10, burst=2)
+    now = bucket.stamp
+    assert bucket.take(now) and bucket.take(now)
+    assert not bucket.take(now)
+    assert bucket.take(now + 0.2)
+
+
+def test_repeat_in_same_tick_is_dropped():
+    gate = Gate()
+    assert gate.admit("cashout", 7)
+    assert not gate.admit("cashout", 7)
+    assert gate.admit("cashout", 8)
+
+
+def test_corrected_stake_in_same_tick_is_admitted():
+    gate = Gate()
+    assert gate.admit("bet", 7, 10)
+    assert not gate.admit("bet", 7, 10)
+    assert gate.admit("bet", 7, 25)
+
+
+def test_closed_action_until_reopened():
+    gate = Gate()
+    gate.close("cashout")
+    assert not gate.admit("cashout", 1)
+    gate.open("cashout")
+    assert gate.admit("cashout", 1)
+
+
+def test_flood_is_capped():
+    now = time.monotonic()
+    gate = Gate()
+    admitted = sum(gate.admit("bet", now=now) for _ in range(BURST * 5))
+    assert admitted == BURST
+
+
+def test_control_frames_pass_during_a_bet_flood():
+    now = time.monotonic()
+    gate = Gate()
+    while gate.admit("bet", now=now):
+        pass
+    assert gate.admit("register", now=now)
+    assert gate.admit("hello", now=now)
+    # ...but have a cap of their own
+    assert sum(gate.admit("watch", now=now) for _ in range(CONTROL_BURST * 2)) == CONTROL_BURST - 2
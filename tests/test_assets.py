@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+import assets
+from assets import Asset, StaticBuild, build
+
+BODY = "body{color:red}" * 40  # long enough to be compressed
+
+
+def site(tmp_path, css):
+    src = tmp_path / "web"
+    src.mkdir(exist_ok=True)
+    (src / "style.css").write_text(css)
+    (src / "index.html").write_text('<link href="style.css">')
+    return str(src)
+
+
+def test_gzip_and_identity_have_their_own_etags(tmp_path):
+    out = str(tmp_path / "dist")
+    build([(site(tmp_path, BODY), "")], out)
+    static = StaticBuild(out)
+    plain = static.response("style.css", {})
+    gz = static.response("style.css", {"accept-encoding": "gzip"})
+    assert gz.headers["content-encoding"] == "gzip"
+    assert gz.headers["etag"] == plain.headers["etag"][:-1] + '-gz"'
+    assert gz.headers["vary"] == plain.headers["vary"] == "Accept-Encoding"
+    # A cached identity body doesn't validate the gzip variant, and vice versa
+    assert static.response("style.css", {"accept-encoding": "gzip",
+                                         "if-none-match": plain.headers["etag"]}).status_code == 200
+    assert static.response("style.css", {"accept-encoding": "gzip",
+                                         "if-none-match": gz.headers["etag"]}).status_code == 304
+
+
+def test_in_memory_asset_etags_per_encoding():
+    asset = Asset("a.css", BODY, "text/css")
+    assert asset.response({}).headers["etag"] != asset.response({"accept-encoding": "gzip"}).headers["etag"]
+
+
+def test_previous_build_served_during_grace(tmp_path):
+    out = str(tmp_path / "dist")
+    old = build([(site(tmp_path, BODY), "")], out)["style.css"]
+    new = build([(site(tmp_path, BODY + "p{}"), "")], out)["style.css"]
+    assert old != new
+    static = StaticBuild(out)
+    assert static.response(old, {}).status_code == 200
+    assert static.response(new, {}).status_code == 200
+    # The plain name is the new build's
+    assert static.response("style.css", {}).headers["etag"] == static.response(new, {}).headers["etag"]
+
+
+def test_expired_builds_are_pruned(tmp_path):
+    out = str(tmp_path / "dist")
+    old = build([(site(tmp_path, BODY), "")], out)["style.css"]
+    new = build([(site(tmp_path, BODY + "p{}"), "")], out)["style.css"]
+    later = assets.time.time() + assets.GRACE + 1
+    assets.prune(out, now=later)
+    assert not os.path.exists(os.path.join(out, old))
+    assert not os.path.exists(os.path.join(out, old + ".gz"))
+    assert os.path.exists(os.path.join(out, new))
+    assert assets.previous_manifests(out, now=later) == []
+
+
+def test_missing_build_is_refused(tmp_path):
+    with pytest.raises(RuntimeError, match="assets.py build"):
+        StaticBuild(str(tmp_path / "dist"))
@@ -0,0 +1,28 @@
+import asyncio
+import json
+
+import fakeredis
+
+import cluster
+
+
+def test_relay_survives_a_bad_message():
+    async def scenario():
+        client = fakeredis.FakeAsyncRedis(decode_responses=True)
+        got = []
+
+        async def on_message(channel, data, droppable):
+            got.append((json.loads(data), droppable))  # raises on bad JSON
+
+        task = asyncio.create_task(cluster.relay(client, on_message))
+        await asyncio.sleep(0.05)
+        await cluster.publish(client, "not json")
+        await cluster.publish(client, json.dumps({"m": 1}), droppable=True)
+        await cluster.publish(client, json.dumps({"e": 2}))
+        for _ in range(50):
+            if len(got) == 2:
+                break
+            await asyncio.sleep(0.01)
+        task.cancel()
+        return got
+    assert asyncio.run(scenario()) == [({"m": 1}, True), ({"e": 2}, False)]
@@ -0,0 +1,117 @@
+import json
+import os
+import sqlite3
+
+import fakeredis
+import numpy as np
+import pytest
+
+import export
+import migrations
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "aviator.db")
+    conn = sqlite3.connect(path)
+    migrations.migrate(conn)
+    conn.execute("INSERT INTO users(username,password,balance) VALUES('a','x',0),('b','x',0)")
+    conn.executemany("INSERT INTO rounds(id,crash_point,timestamp) VALUES (?,?,?)",
+                     [(1, 2.0, 0), (2, 1.2, 10), (3, 5.0, 86400)])
+    conn.executemany("INSERT INTO bets(user_id,round_id,stake,multiplier,payout) VALUES (?,?,?,?,?)",
+                     [(1, 1, 100, 1.5, 150), (2, 1, 200, None, 0), (1, 3, 100, 4.0, 400)])
+    conn.commit()
+    yield path, conn
+    conn.close()
+
+
+def test_export_is_incremental(db, tmp_path, monkeypatch):
+    path, conn = db
+    monkeypatch.setattr(export, "CHUNK", 2)
+    store = export.Store(str(tmp_path / "out"))
+    assert export.export_sqlite(store, path) == {"rounds": 3, "bets": 3}
+    conn.execute("INSERT INTO bets(user_id,round_id,stake,multiplier,payout) VALUES (2,3,50,2.0,100)")
+    conn.commit()
+    store = export.Store(str(tmp_path / "out"))  # meta.json read back
+    assert export.export_sqlite(store, path) == {"rounds": 0, "bets": 1}
+    bets = store.columns("bets")
+    assert bets["id"].tolist() == [1, 2, 3, 4]
+    assert bets["stake"].tolist() == [100, 200, 100, 50]
+    assert np.isnan(bets["multiplier"][1])
+    assert store.meta["bets"] == {"rows": 4, "last": 4}
+
+
+def test_append_column_overwrites_rows_past_the_count(tmp_path):
+    path = str(tmp_path / "x.npy")
+    export.append_column(path, np.arange(3, dtype="i8"), 0)
+    export.append_column(path, np.array([7, 8], "i8"), 2)  # row 2 left by an interrupted run
+    assert np.load(path).tolist() == [0, 1, 7, 8]
+
+
+def test_report(db, tmp_path):
+    path, _ = db
+    store = export.Store(str(tmp_path / "out"))
+    export.export_sqlite(store, path)
+    r = export.report(store)
+    assert [(d["day"], d["rounds"], d["bets"], d["staked"], d["paid"]) for d in r["rtp_by_day"]] == \
+        [("1970-01-01", 2, 2, 3.0, 1.5), ("1970-01-02", 1, 1, 1.0, 4.0)]
+    assert sum(r["multipliers"]["counts"]) == 2
+    assert [(u["user_id"], u["pnl"]) for u in r["user_pnl"]] == [(1, 3.5), (2, -2.0)]
+
+
+def test_export_redis(tmp_path, monkeypatch):
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeRedis(server=server, decode_responses=True)
+    client.rpush("history", 3.0, 2.0, 1.5)  # newest first
+    client.hset("round", "round_id", 11)
+    client.set("betting_open", "1")  # round 11 still running
+    monkeypatch.setattr(export.redis, "Redis", lambda **kw: fakeredis.FakeRedis(server=server, **kw))
+    store = export.Store(str(tmp_path / "out"))
+    assert export.export_redis(store, "localhost:6379") == 3
+    assert export.export_redis(store, "localhost:6379") == 0
+    history = store.columns("history")
+    assert history["round_id"].tolist() == [8, 9, 10]
+    assert history["crash_point"].tolist() == [1.5, 2.0, 3.0]
+
+
+def test_unmigrated_database_is_refused(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    for statement in migrations.BASELINE:
+        conn.execute(statement)
+    conn.execute("PRAGMA user_version=1")
+    conn.close()
+    with pytest.raises(RuntimeError, match="schema v1"):
+        export.export_sqlite(export.Store(str(tmp_path / "out")), path)
+
+
+def test_pre_bets_export_is_replaced(db, tmp_path):
+    path, _ = db
+    out = str(tmp_path / "out")
+    os.makedirs(os.path.join(out, "cashouts"))
+    with open(os.path.join(out, "meta.json"), "w") as f:
+        json.dump({"cashouts": {"rows": 2, "last": 2}, "rounds": {"rows": 0, "last": 0}}, f)
+    store = export.Store(out)
+    assert export.export_sqlite(store, path)["bets"] == 3
+    assert "cashouts" not in store.meta
+    assert not os.path.exists(os.path.join(out, "cashouts"))
+    with open(os.path.join(out, "meta.json")) as f:
+        assert set(json.load(f)) == {"rounds", "bets"}
+
+
+def test_export_redis_labels_the_leaders_rounds(aviator_web, redis_server, tmp_path, monkeypatch):
+    from starlette.testclient import TestClient
+    monkeypatch.setattr(export.redis, "Redis", lambda **kw: fakeredis.FakeRedis(server=redis_server, **kw))
+    with TestClient(aviator_web.app) as client:
+        with client.websocket_connect("/ws") as ws:
+            ws.send_text(json.dumps({"action": "register", "user_id": "u1"}))
+            while True:
+                message = json.loads(ws.receive_text())
+                if message["action"] == "round_end":
+                    break
+            store = export.Store(str(tmp_path / "out"))
+            export.export_redis(store, "localhost:6379")
+    history = store.columns("history")
+    # round_end's seq is (round id << 16) + ticks + 1
+    assert history["round_id"].tolist()[-1] == message["seq"] >> 16
+    assert round(history["crash_point"][-1], 2) == message["final_multiplier"]
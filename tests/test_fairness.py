@@ -0,0 +1,39 @@
+import hashlib
+import os
+
+import pytest
+
+from fairness import HashChain, generate, commitment_of
+
+
+def test_chain_is_built_on_first_use(tmp_path):
+    path = str(tmp_path / "test.chain")
+    chain = HashChain(path, rounds=10)
+    assert not os.path.exists(path)
+    index, h = chain.next()
+    assert index == 0 and os.path.exists(path)
+    assert hashlib.sha256(h).hexdigest() == chain.commitment
+
+
+def test_hashes_link_and_cursor_survives_restart(tmp_path):
+    path = str(tmp_path / "test.chain")
+    commitment = generate(path, 5, seed=b"s")
+    chain = HashChain(path)
+    _, h0 = chain.next()
+    _, h1 = chain.next()
+    assert commitment_of(h0) == commitment
+    assert hashlib.sha256(h1).digest() == h0
+    assert HashChain(path).next()[0] == 2
+
+
+def test_missing_or_corrupt_cursor_is_refused(tmp_path):
+    path = str(tmp_path / "test.chain")
+    generate(path, 5, seed=b"s")
+    HashChain(path).next()
+    with open(path + ".cursor", "w") as f:
+        f.write("")
+    with pytest.raises(RuntimeError, match="cursor"):
+        HashChain(path).next()
+    os.remove(path + ".cursor")
+    with pytest.raises(RuntimeError, match="cursor"):
+        HashChain(path).next()
@@ -0,0 +1,53 @@
+import asyncio
+
+from fanout import Fanout
+
+
+class FakeSocket:
+    def __init__(self, stall=False):
+        self.sent = []
+        self.stall = asyncio.Event() if stall else None
+        self.closed = None
+
+    async def send_text(self, data):
+        if self.stall is not None:
+            await self.stall.wait()
+        self.sent.append(data)
+
+    async def send_bytes(self, data):
+        await self.send_text(data)
+
+    async def close(self, code=1000):
+        self.closed = code
+
+
+def test_slow_socket_does_not_hold_back_others():
+    async def scenario():
+        fanout = Fanout()
+        fast, slow = FakeSocket(), FakeSocket(stall=True)
+        fanout.add(fast)
+        fanout.add(slow)
+        for m in range(5):
+            fanout.publish({"m": m}, droppable=True)  # never awaits
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.01)
+        slow.stall.set()
+        await asyncio.sleep(0.01)
+        return fast.sent, slow.sent
+    fast, slow = asyncio.run(scenario())
+    assert len(fast) == 5
+    # The stalled socket's queued ticks were coalesced to the latest
+    assert slow[-1] == '{"m": 4}' and len(slow) < 5
+
+
+def test_full_queue_of_events_disconnects():
+    async def scenario():
+        fanout = Fanout(queue_size=2)
+        slow = FakeSocket(stall=True)
+        fanout.add(slow)
+        await asyncio.sleep(0)
+        for m in range(4):
+            fanout.publish({"m": m})
+        await asyncio.sleep(0.01)
+        return len(fanout), slow.closed
+    assert asyncio.run(scenario()) == (0, 1013)
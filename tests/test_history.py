@@ -0,0 +1,29 @@
+from history import RoundHistory
+
+
+def test_ring_keeps_latest_and_aggregates():
+    h = RoundHistory(3)
+    h.extend([1.5, 3.0, 10.0, 1.2])
+    assert h.values() == [3.0, 10.0, 1.2]
+    assert h.values(newest_first=True) == [1.2, 10.0, 3.0]
+    assert len(h) == 3
+    assert abs(h.mean() - 14.2/3) < 1e-9
+    assert h.stats()["below_2x"] == 1
+
+
+def test_streak_is_capped_by_the_window():
+    h = RoundHistory(50)
+    h.extend([1.1]*60)
+    stats = h.stats()
+    assert stats["streak_below_2x"] == 50 == stats["below_2x"]
+    h.push(5.0)
+    assert h.stats()["streak_below_2x"] == 0
+
+
+def test_snapshot_is_cached_until_push():
+    h = RoundHistory(5)
+    h.push(1.234)
+    first = h.snapshot()
+    assert first == [1.23] and h.snapshot() is first
+    h.push(2.0)
+    assert h.snapshot() == [1.23, 2.0]
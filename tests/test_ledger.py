@@ -0,0 +1,57 @@
+import sqlite3
+
+import pytest
+
+import migrations
+from ledger import Ledger
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "aviator.db")
+    conn = sqlite3.connect(path)
+    migrations.migrate(conn)
+    conn.execute("INSERT INTO users(username,password,balance) VALUES('a','x',1000)")
+    conn.commit()
+    yield path, conn
+    conn.close()
+
+
+def test_flush_writes_round_bet_and_balance(db):
+    path, conn = db
+    ledger = Ledger(path)
+    ledger.add_round(1, 2.5, 1.7e9)
+    ledger.add_bet(1, 1, 100, 1.5, 150)
+    ledger.add_balance(1, 50)
+    ledger.flush()
+    assert not ledger.has_pending()
+    assert conn.execute("SELECT balance FROM users WHERE id=1").fetchone() == (1050,)
+    assert conn.execute("SELECT user_id,round_id,stake,payout FROM bets").fetchall() == [(1, 1, 100, 150)]
+
+
+def test_bad_row_does_not_hold_back_balances(db):
+    path, conn = db
+    ledger = Ledger(path)
+    ledger.add_bet(1, 5, 100, 1.5, 150)  # round 5 doesn't exist
+    ledger.add_balance(1, 100)
+    ledger.flush()
+    assert not ledger.has_pending()
+    assert ledger.rejected == 1
+    assert conn.execute("SELECT balance FROM users WHERE id=1").fetchone() == (1100,)
+    assert conn.execute("SELECT COUNT(*) FROM bets").fetchone() == (0,)
+    table, row, error = conn.execute("SELECT tbl,row,error FROM ledger_rejects").fetchone()
+    assert table == "bets" and row == "[1, 5, 100, 1.5, 150]" and "FOREIGN KEY" in error
+    # Later flushes are unaffected
+    ledger.add_balance(1, 1)
+    ledger.flush()
+    assert conn.execute("SELECT balance FROM users WHERE id=1").fetchone() == (1101,)
+
+
+def test_operational_error_restores_batch(db):
+    path, conn = db
+    ledger = Ledger(path)
+    ledger.add_balance(1, 7)
+    ledger.conn.execute("DROP TABLE users")
+    with pytest.raises(sqlite3.OperationalError):
+        ledger.flush()
+    assert ledger.pending_balance(1) == 7
@@ -0,0 +1,57 @@
+import re
+
+from starlette.testclient import TestClient
+
+import metrics
+
+SAMPLE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{[^}]*\})? (\S+)$")
+SUFFIXES = {"histogram": ("_bucket", "_sum", "_count")}
+
+
+def parse(text):
+    # name -> (type, {sample name: value}) per the Prometheus text format:
+    # every sample has to belong to the metric declared by the TYPE above it
+    families = {}
+    current = None
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split()
+            current = families[name] = (kind, {})
+        elif line.startswith("#") or not line:
+            continue
+        else:
+            name, labels, value = SAMPLE.match(line).groups()
+            kind, samples = current
+            base = name
+            for suffix in SUFFIXES.get(kind, ()):
+                if name.endswith(suffix):
+                    base = name[:-len(suffix)]
+            assert base in families and families[base] is current, f"{name} is untyped"
+            samples[name + (labels or "")] = float(value)
+    return families
+
+
+def test_counter_sample_matches_its_type():
+    counter = metrics.Counter("test_events", "Events")
+    counter.inc(3)
+    families = parse(metrics.render())
+    assert families["test_events_total"] == ("counter", {"test_events_total": 3.0})
+
+
+def test_histogram_buckets_are_cumulative():
+    hist = metrics.Histogram("test_seconds", "Durations")
+    for v in (0.001, 0.01, 100.0):
+        hist.observe(v)
+    kind, samples = parse(metrics.render())["test_seconds"]
+    assert kind == "histogram"
+    buckets = [v for k, v in samples.items() if k.startswith("test_seconds_bucket")]
+    assert buckets == sorted(buckets) and buckets[-1] == 3 == samples["test_seconds_count"]
+
+
+def test_server_metrics_endpoint_parses():
+    import main
+    response = TestClient(main.app).get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain")
+    families = parse(response.text)
+    assert families["aviator_rounds_total"][0] == "counter"
+    assert families["aviator_connections"][0] == "gauge"
@@ -0,0 +1,54 @@
+import sqlite3
+
+import pytest
+
+import migrations
+
+
+@pytest.fixture
+def legacy(tmp_path):
+    # A database from before migrations: REAL balances and a cashouts table
+    conn = sqlite3.connect(str(tmp_path / "aviator.db"))
+    for statement in migrations.BASELINE:
+        conn.execute(statement)
+    conn.execute("INSERT INTO users(username,password,balance) VALUES('a','x',1000.1),('b','y',0.3)")
+    conn.execute("INSERT INTO rounds(crash_point,timestamp) VALUES(2.0,1.7e9)")
+    conn.execute("""INSERT INTO cashouts(user_id,round_id,multiplier,amount)
+                    VALUES(1,1,1.5,15.0),(2,5,2.0,4.0),(9,1,2.0,2.0),(1,1,0,3.0),(1,1,NULL,NULL)""")
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def test_fresh_database_reaches_latest(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "new.db"))
+    assert migrations.migrate(conn) == len(migrations.MIGRATIONS)
+    assert migrations.version(conn) == len(migrations.MIGRATIONS)
+    assert migrations.migrate(conn) == 0
+
+
+def test_legacy_money_moves_to_cents(legacy):
+    migrations.migrate(legacy)
+    assert legacy.execute("SELECT id,balance FROM users").fetchall() == [(1, 100010), (2, 30)]
+    # Unknown round -> NULL, unknown user -> dropped, no usable multiplier -> no stake
+    assert legacy.execute("SELECT id,user_id,round_id,stake,payout FROM bets").fetchall() == [
+        (1, 1, 1, 1000, 1500), (2, 2, None, 200, 400), (4, 1, 1, 0, 300), (5, 1, 1, 0, 0)]
+    assert legacy.execute("SELECT name FROM sqlite_master WHERE name='cashouts'").fetchone() is None
+
+
+def test_newer_schema_is_refused(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "new.db"))
+    conn.execute(f"PRAGMA user_version={len(migrations.MIGRATIONS) + 1}")
+    with pytest.raises(RuntimeError):
+        migrations.migrate(conn)
+
+
+@pytest.mark.parametrize("query, index", [
+    ("SELECT round_id,stake,payout FROM bets WHERE user_id=1 ORDER BY id DESC LIMIT 50", "bets_user"),
+    ("SELECT user_id,stake,multiplier,payout FROM bets WHERE round_id=1", "bets_round"),
+    ("SELECT crash_point FROM rounds WHERE timestamp BETWEEN 1 AND 2", "rounds_timestamp"),
+])
+def test_queries_use_covering_indexes(legacy, query, index):
+    migrations.migrate(legacy)
+    plan = " ".join(row[-1] for row in legacy.execute("EXPLAIN QUERY PLAN " + query))
+    assert f"COVERING INDEX {index}" in plan
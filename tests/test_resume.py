@@ -0,0 +1,53 @@
+import asyncio
+
+from resume import Sessions, ReplayBuffer, sweep
+
+
+def test_detached_session_resumes_then_expires():
+    sessions = Sessions(ttl=0.05)
+    token = sessions.open({"user": 1})
+    sessions.detach(token)
+    assert sessions.resume(token) == {"user": 1}
+    sessions.detach(token)
+
+    async def idle_server():
+        task = asyncio.create_task(sweep(sessions, interval=0.02))
+        await asyncio.sleep(0.15)
+        task.cancel()
+    asyncio.run(idle_server())
+    assert sessions.get(token) is None and len(sessions) == 0
+
+
+def test_attached_session_never_expires():
+    sessions = Sessions(ttl=0)
+    token = sessions.open({})
+    assert sessions.expire() == [] and sessions.get(token) == {}
+
+
+def test_replay_sends_missed_events_and_latest_tick_only():
+    replay = ReplayBuffer()
+    replay.start_round()
+    for seq, event, tick in [(1, "start", False), (2, "t2", True), (3, "t3", True), (4, "bet", False), (5, "t5", True)]:
+        replay.add(seq, event, tick)
+    assert replay.since(1) == ["bet", "t5"]
+    assert replay.since(5) == []
+
+
+def test_out_of_order_tick_does_not_replace_newer():
+    replay = ReplayBuffer()
+    replay.add(3, "t3", True)
+    replay.add(2, "t2", True)
+    assert replay.seq == 3 and replay.since(0) == ["t3"]
+
+
+def test_gap_or_earlier_round_falls_back_to_full_init():
+    replay = ReplayBuffer(size=2)
+    replay.start_round()
+    for seq in range(1, 5):
+        replay.add(seq, f"e{seq}")
+    assert replay.since(0) is None  # e1, e2 fell out of the buffer
+    assert replay.since(2) == ["e3", "e4"]
+    replay.start_round()
+    replay.add(10, "next round")
+    assert replay.since(3) is None
+    assert replay.since(99) is None  # from the future
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+from starlette.testclient import TestClient
+
+from fairness import HashChain
+
+
+@pytest.fixture
+def main(monkeypatch, tmp_path):
+    import main as module
+    # Rounds draw from a chain of their own, not the one in the source tree
+    monkeypatch.setattr(module, "chain", HashChain(str(tmp_path / "rounds.chain"), rounds=100))
+    return module
+
+
+def test_main_resume_keeps_balance_and_bet(main):
+    with TestClient(main.app) as client:
+        with client.websocket_connect("/ws") as ws:
+            ws.send_json({"type": "hello"})
+            session = ws.receive_json()
+            assert session["commitment"] == main.chain.commitment
+            ws.send_json({"type": "place_bet", "bet": 100})
+            start = ws.receive_json()
+            assert start["type"] == "round_start"
+        with client.websocket_connect("/ws") as ws:
+            ws.send_json({"type": "hello", "resume": session["token"], "seq": start["seq"]})
+            resumed = ws.receive_json()
+            assert resumed["type"] == "session" and resumed["token"] == session["token"]
+            assert resumed["resumed"] is True
+            assert resumed["balance"] == session["balance"] - 100
+            assert session["token"] in main.current_round.bets
+        main.current_round.active = False
+
+
+def test_main_unknown_token_gets_a_fresh_session(main):
+    with TestClient(main.app) as client:
+        with client.websocket_connect("/ws") as ws:
+            ws.send_json({"type": "hello", "resume": "nope", "seq": 3})
+            session = ws.receive_json()
+            assert session["token"] != "nope" and "resumed" not in session
+
+
+def test_aviator_web_resume_within_a_round(aviator_web):
+    with TestClient(aviator_web.app) as client:
+        with client.websocket_connect("/ws") as ws:
+            ws.send_text(json.dumps({"action": "register", "user_id": "u1"}))
+            session = json.loads(ws.receive_text())
+            # The balance and round events can interleave
+            balance = tick = None
+            while balance is None or tick is None:
+                message = json.loads(ws.receive_text())
+                if message["action"] == "update_balance":
+                    balance = message["balance"]
+                elif message["action"] == "update_multiplier":
+                    tick = message
+            assert balance == 1000
+            seq = tick["seq"]
+        with client.websocket_connect("/ws") as ws:
+            ws.send_text(json.dumps({"action": "register", "user_id": "u1",
+                                     "resume": session["token"], "seq": seq}))
+            assert json.loads(ws.receive_text()) == {"action": "session", "token": session["token"],
+                                                     "resumed": True}
+            # No balance reload; missed ticks coalesce into the latest one
+            first = json.loads(ws.receive_text())
+            assert first["action"] == "update_multiplier" and first["seq"] > seq
@@ -0,0 +1,76 @@
+import asyncio
+
+import fakeredis
+import pytest
+
+import scripts
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def client():
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    run(scripts.load_scripts(client))
+    return client
+
+
+async def bet(client, user, amount):
+    return await scripts.run(client, "bet", [f"user:{user}", "betting_open"], [amount, scripts.START_BALANCE])
+
+
+async def cashout(client, user, multiplier):
+    return await scripts.run(client, "cashout", [f"user:{user}", "betting_open"], [multiplier])
+
+
+def test_bet_and_cashout(client):
+    async def scenario():
+        await client.set("betting_open", 1)
+        assert await bet(client, "u", 100) == [1, "900"]
+        assert await cashout(client, "u", 2.5) == [1, "250"]
+        return await client.hgetall("user:u")
+    assert run(scenario()) == {"balance": "1150", "bet": "100", "cashed_out": "1"}
+
+
+def test_bet_over_balance_changes_nothing(client):
+    async def scenario():
+        await client.set("betting_open", 1)
+        reply = await bet(client, "u", scripts.START_BALANCE + 1)
+        return reply, await client.hgetall("user:u")
+    reply, user = run(scenario())
+    assert reply == [0, "Insufficient balance"]
+    assert user == {"balance": str(scripts.START_BALANCE), "bet": "0", "cashed_out": "0"}
+
+
+def test_bet_when_closed(client):
+    assert run(bet(client, "u", 10)) == [0, "Betting closed"]
+
+
+def test_double_cashout_pays_once(client):
+    async def scenario():
+        await client.set("betting_open", 1)
+        await bet(client, "u", 100)
+        first, second = await asyncio.gather(cashout(client, "u", 2), cashout(client, "u", 3))
+        return first, second, await client.hget("user:u", "balance")
+    first, second, balance = run(scenario())
+    assert first == [1, "200"] and second == [0, ""]
+    assert balance == "1100"
+
+
+def test_cashout_after_crash(client):
+    async def scenario():
+        await client.set("betting_open", 1)
+        await bet(client, "u", 100)
+        await client.set("betting_open", 0)  # round ended
+        return await cashout(client, "u", 2), await client.hget("user:u", "balance")
+    assert run(scenario()) == ([0, "Round over"], "900")
+
+
+def test_reload_after_script_flush(client):
+    async def scenario():
+        await client.set("betting_open", 1)
+        await client.script_flush()  # as after a Redis restart
+        return await bet(client, "u", 10)
+    assert run(scenario()) == [1, "990"]
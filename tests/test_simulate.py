@@ -0,0 +1,25 @@
+import numpy as np
+
+import crash_models
+import simulate
+
+
+def walk_reference(rng, n, targets):
+    # The full-path formulation payouts_walk replaces
+    path = np.empty((simulate.WALK_TICKS, n))
+    multiplier = np.ones(n)
+    for t in range(simulate.WALK_TICKS):
+        multiplier = crash_models.walk_step_array(multiplier, rng)
+        path[t] = multiplier
+    out = np.empty((len(targets), n))
+    for i, target in enumerate(targets):
+        hit = path >= target
+        out[i] = np.where(hit.any(axis=0), path[hit.argmax(axis=0), np.arange(n)], path[-1])
+    return out
+
+
+def test_walk_payouts_match_full_path():
+    targets = [1.1, 2.0, 5.0, float("inf")]
+    got = simulate.payouts_walk(np.random.default_rng(7), 5000, targets)
+    want = walk_reference(np.random.default_rng(7), 5000, targets)
+    assert np.array_equal(got, want)
@@ -0,0 +1,18 @@
+from ticker import Ticker
+
+
+def test_ticks_land_on_absolute_deadlines():
+    ticker = Ticker(0.5, start=100.0)
+    assert abs(ticker.wait(now=99.9) - 0.1) < 1e-9
+    assert ticker.fire(now=100.1) == 0
+    assert abs(ticker.lag - 0.1) < 1e-9 and ticker.deadline == 100.5
+    # Firing late doesn't push the next deadline back
+    assert abs(ticker.wait(now=100.4) - 0.1) < 1e-9
+
+
+def test_late_ticks_merge():
+    ticker = Ticker(0.5, start=100.0)
+    ticker.fire(now=100.0)
+    assert ticker.fire(now=101.6) == 3  # ticks 1 and 2 merged into 3
+    assert ticker.merged == 2 and ticker.skipped == 2
+    assert ticker.deadline == 102.0
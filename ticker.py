@@ -0,0 +1,42 @@
+import asyncio
+import time
+
+# --- Tick scheduler ---
+# Game loops that sleep a fixed interval after doing their work tick every
+# interval + work, so the multiplier visibly slows down as broadcasts get
+# more expensive.  A Ticker instead aims every tick at an absolute deadline
+#     start + k*interval
+# on the monotonic clock.  A tick that wakes up more than a whole interval
+# late merges the ticks it missed into one instead of firing a burst to
+# catch up; the caller sees how many were merged and how late it fired.
+
+
+class Ticker:
+    def __init__(self, interval, start=None):
+        self.interval = interval
+        self.start = time.monotonic() if start is None else start
+        self.index = -1      # number of the last tick fired
+        self.deadline = self.start
+        self.lag = 0.0       # how late the last tick fired, seconds
+        self.merged = 0      # ticks folded into the last one
+        self.skipped = 0     # ticks merged away since start
+
+    def wait(self, now=None):
+        # Seconds until the next tick is due
+        now = time.monotonic() if now is None else now
+        return max(self.deadline - now, 0.0)
+
+    def fire(self, now=None):
+        # Call on wake-up; returns the number of the tick that is due, which
+        # is ahead of the last one by 1 + merged
+        now = time.monotonic() if now is None else now
+        self.lag = max(now - self.deadline, 0.0)
+        self.merged = int(self.lag // self.interval)
+        self.skipped += self.merged
+        self.index += 1 + self.merged
+        self.deadline = self.start + (self.index + 1)*self.interval
+        return self.index
+
+    async def asleep(self):
+        await asyncio.sleep(self.wait())
+        return self.fire()
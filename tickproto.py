@@ -0,0 +1,80 @@
+import struct
+
+# --- Binary tick protocol ---
+# Opt-in compact encoding for multiplier ticks, shared by all three servers.
+# Multipliers are fixed-point hundredths.  Every frame carries the round id
+# and a 16-bit tick sequence number:
+#
+#   DELTA  <B I H h   op=1, round_id, seq, change since previous tick   9 bytes
+#   KEY    <B I H I   op=2, round_id, seq, absolute multiplier         11 bytes
+#
+# A client applies a DELTA only if its seq directly follows the last frame
+# it saw; after a gap it waits for the next KEY frame, which is sent on the
+# first tick of a round, every KEY_EVERY ticks, and whenever a delta does
+# not fit in 16 bits.  Servers that drop or coalesce ticks for a slow client
+# send the KEY form of the next frame instead (see encode()).
+#
+# JSON stays the default; clients ask for binary when they connect.
+
+OP_DELTA = 1
+OP_KEY = 2
+DELTA = struct.Struct("<BIHh")
+KEY = struct.Struct("<BIHI")
+KEY_EVERY = 20
+
+
+def fixed(multiplier):
+    return int(round(multiplier*100))
+
+
+class TickEncoder:
+    def __init__(self):
+        self.round_id = 0
+        self.seq = 0
+        self.last = None
+        self.key = None  # KEY form of the latest tick, for late joiners
+
+    def start(self, round_id):
+        self.round_id = round_id & 0xFFFFFFFF
+        self.seq = 0
+        self.last = None
+        self.key = None
+
+    def encode(self, multiplier):
+        # Returns (frame, key): frame is the cheapest valid encoding, key the
+        # self-contained KEY form of the same tick for resynchronising
+        value = fixed(multiplier)
+        seq = self.seq
+        key = KEY.pack(OP_KEY, self.round_id, seq, value)
+        frame = key
+        if self.last is not None and seq % KEY_EVERY:
+            delta = value - self.last
+            if -0x8000 <= delta <= 0x7FFF:
+                frame = DELTA.pack(OP_DELTA, self.round_id, seq, delta)
+        self.last = value
+        self.key = key
+        self.seq = (seq + 1) & 0xFFFF
+        return frame, key
+
+
+class TickDecoder:
+    # Reference decoder; the bundled JS clients implement the same rules
+    def __init__(self):
+        self.round_id = None
+        self.seq = None
+        self.value = None
+
+    def decode(self, data):
+        op = data[0]
+        if op == OP_KEY:
+            _, self.round_id, self.seq, self.value = KEY.unpack(data)
+        elif op == OP_DELTA:
+            _, round_id, seq, delta = DELTA.unpack(data)
+            if self.value is None or round_id != self.round_id or seq != (self.seq + 1) & 0xFFFF:
+                self.value = None
+                return None
+            self.seq = seq
+            self.value += delta
+        else:
+            return None
+        return self.value/100
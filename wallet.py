@@ -0,0 +1,79 @@
+import threading
+import time
+
+# --- Wallet ---
+# Hot balances (integer cents) live in memory keyed by user_id.
+# reserve/settle/refund update the cached balance atomically and queue the
+# delta on the ledger, which persists it on its next flush.  A balance is loaded once (at login or
+# on the first connect) and evicted EVICT_AFTER seconds after the user's last
+# socket disconnects, provided the ledger has flushed everything for them.
+
+EVICT_AFTER = 60  # seconds
+
+
+class Wallet:
+    def __init__(self, ledger, load, evict_after=EVICT_AFTER):
+        self.ledger = ledger
+        self.load = load  # user_id -> balance, used on a cache miss
+        self.evict_after = evict_after
+        self.balances = {}  # user_id -> balance
+        self.refs = {}      # user_id -> open sockets
+        self.idle = {}      # user_id -> eviction deadline
+        self.lock = threading.Lock()
+
+    def warm(self, user_id, balance):
+        with self.lock:
+            if user_id not in self.balances:
+                self.balances[user_id] = balance
+                self.idle[user_id] = time.monotonic() + self.evict_after
+
+    def attach(self, user_id):
+        with self.lock:
+            cached = user_id in self.balances
+        if not cached:
+            self.warm(user_id, self.load(user_id))
+        with self.lock:
+            self.refs[user_id] = self.refs.get(user_id, 0) + 1
+            self.idle.pop(user_id, None)
+            return self.balances[user_id]
+
+    def detach(self, user_id):
+        with self.lock:
+            refs = self.refs.get(user_id, 0) - 1
+            if refs > 0:
+                self.refs[user_id] = refs
+                return
+            self.refs.pop(user_id, None)
+            if user_id in self.balances:
+                self.idle[user_id] = time.monotonic() + self.evict_after
+
+    def evict_idle(self):
+        now = time.monotonic()
+        with self.lock:
+            for user_id, deadline in list(self.idle.items()):
+                if deadline <= now and not self.ledger.pending_balance(user_id):
+                    del self.idle[user_id]
+                    del self.balances[user_id]
+
+    def balance(self, user_id):
+        return self.balances.get(user_id, 0)
+
+    def reserve(self, user_id, bet):
+        with self.lock:
+            balance = self.balances.get(user_id)
+            if balance is None or bet <= 0 or bet > balance:
+                return None
+            balance -= bet
+            self.balances[user_id] = balance
+            self.ledger.add_balance(user_id, -bet)
+            return balance
+
+    def settle(self, user_id, win):
+        with self.lock:
+            balance = self.balances[user_id] + win
+            self.balances[user_id] = balance
+            self.ledger.add_balance(user_id, win)
+            return balance
+
+    def refund(self, user_id, bet):
+        return self.settle(user_id, bet)